@@ -0,0 +1,155 @@
+"""
+Файл backends.py — Бэкенды инференса модели:
+1) torch      - PyTorch FP32 (как раньше, GPU если доступен)
+2) torch-int8 - PyTorch с динамической INT8-квантизацией линейных слоев (CPU)
+3) onnx       - экспорт в ONNX Runtime с KV-кэшем декодера (CPU)
+4) Проверка совпадения результатов бэкенда с эталоном FP32
+
+Бэкенд выбирается переменной окружения INFERENCE_BACKEND при запуске.
+torch и transformers импортируются при загрузке модели, а не при импорте модуля.
+Проверка совпадения (из каталога backend):
+    python -m app.backends --backend torch-int8 corpus.jsonl
+
+"""
+
+# Импорт необходимых библиотек
+import argparse                                   # Разбор аргументов проверки совпадения
+import difflib                                    # Сходство суммаризаций разных бэкендов
+import json                                       # Вывод отчета о совпадении
+import logging                                    # Логирование загрузки модели
+import os                                         # Для чтения настроек из переменных окружения
+import time                                       # Замер времени генерации
+
+logger = logging.getLogger(__name__)
+
+# Настройки бэкенда
+BACKENDS = ("torch", "torch-int8", "onnx")                       # Доступные бэкенды
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")      # Бэкенд по умолчанию
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR")                     # Каталог экспортированной ONNX-модели
+
+
+def load_model(model_name, backend=INFERENCE_BACKEND):
+    """
+    Загружает seq2seq модель с выбранным бэкендом.
+
+    Аргументы:
+        1) model_name (str): ID модели или путь к ней
+        2) backend (str): Один из BACKENDS
+
+    Возвращает:
+        Модель с методом generate и свойством device
+
+    Исключения:
+        ValueError: Если бэкенд неизвестен
+        ImportError: Если для onnx не установлен optimum[onnxruntime]
+
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд {backend!r}, доступны: {', '.join(BACKENDS)}")
+
+    if backend == "onnx":
+        return _load_onnx(model_name)
+
+    import torch
+    from transformers import AutoModelForSeq2SeqLM
+
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    model.eval()
+    if backend == "torch-int8":
+        # Веса линейных слоев хранятся в INT8, активации квантуются на лету (только CPU)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info("Backend: PyTorch dynamic INT8 (CPU)")
+        return model
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    logger.info(f"Backend: PyTorch FP32 ({device.upper()})")
+    return model.to(device)
+
+
+def _load_onnx(model_name):
+    """Загружает ONNX-модель из ONNX_MODEL_DIR или экспортирует ее (с KV-кэшем декодера)."""
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        raise ImportError("Для INFERENCE_BACKEND=onnx нужен пакет optimum[onnxruntime]")
+
+    # Уже экспортированная модель - загружаем без повторного экспорта
+    if ONNX_MODEL_DIR and os.path.exists(os.path.join(ONNX_MODEL_DIR, "config.json")):
+        model = ORTModelForSeq2SeqLM.from_pretrained(ONNX_MODEL_DIR, use_cache=True)
+    else:
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_cache=True)
+        if ONNX_MODEL_DIR:
+            model.save_pretrained(ONNX_MODEL_DIR)
+            logger.info(f"ONNX model exported to {ONNX_MODEL_DIR}")
+    logger.info("Backend: ONNX Runtime (CPU, KV cache)")
+    return model
+
+
+def check_parity(chunks, tokenizer, reference, candidate):
+    """
+    Сравнивает суммаризации бэкенда с эталонными.
+
+    Аргументы:
+        1) chunks (list): Части текста - списки ID токенов
+        2) tokenizer: Токенизатор
+        3) reference: Эталонная модель (PyTorch FP32)
+        4) candidate: Проверяемая модель
+
+    Возвращает:
+        dict: Доля точных совпадений, среднее сходство по словам
+            и время генерации каждого бэкенда
+
+    """
+    from app.models import summarize_chunks
+
+    started = time.perf_counter()
+    expected = summarize_chunks(chunks, reference, tokenizer)
+    reference_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = summarize_chunks(chunks, candidate, tokenizer)
+    candidate_seconds = time.perf_counter() - started
+
+    similarity = [
+        difflib.SequenceMatcher(None, a.split(), b.split()).ratio()
+        for a, b in zip(expected, actual)
+    ]
+    return {
+        "chunks": len(chunks),
+        "exact_match": round(sum(a == b for a, b in zip(expected, actual)) / len(chunks), 4),
+        "mean_similarity": round(sum(similarity) / len(chunks), 4),
+        "min_similarity": round(min(similarity), 4),
+        "reference_seconds": round(reference_seconds, 3),
+        "candidate_seconds": round(candidate_seconds, 3),
+    }
+
+
+def main():
+    """Проверка совпадения бэкенда с PyTorch FP32 на корпусе документов."""
+    from app.cli import iter_documents, read_source
+    from app.models import MODEL_NAME, load_summarizer, split_text
+
+    parser = argparse.ArgumentParser(description="Сравнение бэкенда инференса с PyTorch FP32")
+    parser.add_argument("input", help="Каталог с .txt-файлами или JSONL-файл (поля id, text)")
+    parser.add_argument("--backend", choices=BACKENDS, default=INFERENCE_BACKEND,
+                        help="Проверяемый бэкенд")
+    parser.add_argument("--limit", type=int, default=32, help="Максимум чанков для сравнения")
+    args = parser.parse_args()
+
+    reference, tokenizer = load_summarizer(backend="torch")
+    candidate = load_model(MODEL_NAME, args.backend)
+
+    chunks = []
+    for _, source in iter_documents(args.input):
+        chunks.extend(split_text(read_source(source), tokenizer))
+        if len(chunks) >= args.limit:
+            break
+
+    report = check_parity(chunks[:args.limit], tokenizer, reference, candidate)
+    print(json.dumps({"backend": args.backend, **report}, indent=2))
+
+
+# Запуск при прямом выполнении модуля
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
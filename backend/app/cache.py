@@ -0,0 +1,250 @@
+"""
+Файл cache.py — Кэш суммаризаций:
+1) Строит ключи по хэшу содержимого и параметров генерации
+2) Хранит результаты в памяти (LRU с ограничением по объему в байтах)
+3) Опционально сохраняет результаты на диск, чтобы они переживали перезапуск
+4) Ведет счетчики попаданий и промахов
+5) Асинхронные методы обращаются к диску в отдельном потоке, не блокируя event loop
+
+"""
+
+# Импорт необходимых библиотек
+import asyncio                                    # Дисковые операции вне event loop
+import hashlib                                    # Хэширование содержимого для ключей
+import json                                       # Сериализация параметров генерации
+import logging                                    # Логирование работы кэша
+import os                                         # Работа с файлами и переменными окружения
+import threading                                  # Блокировка для доступа из разных потоков
+from array import array                           # Компактное представление ID токенов
+from collections import OrderedDict               # Порядок использования для LRU
+from app.metrics import CACHE_LOOKUPS             # Счетчик обращений к кэшу
+
+logger = logging.getLogger(__name__)
+
+# Настройки кэша
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024))  # Объем кэша в памяти
+CACHE_DIR = os.getenv("CACHE_DIR")                                     # Каталог дискового кэша
+
+
+def make_key(kind, content, params):
+    """
+    Строит ключ кэша.
+
+    Аргументы:
+        1) kind (str): Уровень кэширования ("document" или "chunk")
+        2) content: Текст или список ID токенов
+        3) params (dict): Параметры генерации и ID модели
+
+    Возвращает:
+        str: SHA-256 в шестнадцатеричном виде
+
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"kind": kind, **params}, sort_keys=True).encode("utf-8"))
+    digest.update(b"\0")
+    if isinstance(content, str):
+        digest.update(content.encode("utf-8"))
+    else:
+        digest.update(array("l", content).tobytes())
+    return digest.hexdigest()
+
+
+def document_key(text, params):
+    """
+    Ключ для суммаризации всего документа.
+
+    Хэшируется исходный текст без нормализации пробелов: в модель идет
+    именно он, и тексты, различающиеся только пробелами или переводами
+    строк, разбиваются на разные части.
+
+    """
+    return make_key("document", text, params)
+
+
+def chunk_key(input_ids, params):
+    """Ключ для суммаризации одного чанка (по ID его токенов)."""
+    return make_key("chunk", input_ids, params)
+
+
+class SummaryCache:
+    """
+    Двухуровневый кэш суммаризаций.
+
+    Первый уровень - LRU в памяти с ограничением по суммарному объему
+    значений в байтах. Второй (опциональный) - файлы в cache_dir, по
+    одному на ключ; найденное на диске поднимается в память.
+
+    Аргументы:
+        1) max_bytes (int): Максимальный объем кэша в памяти
+        2) cache_dir (str): Каталог дискового кэша (None - только память)
+
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, cache_dir=CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()     # Ключ -> суммаризация, от старых к новым
+        self._size = 0                    # Текущий объем значений в байтах
+        self._lock = threading.Lock()
+
+        # Счетчики
+        self.hits = 0                     # Найдено в памяти
+        self.disk_hits = 0                # Найдено на диске
+        self.misses = 0                   # Не найдено
+        self.evictions = 0                # Вытеснено из памяти
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            logger.info(f"Disk cache enabled: {cache_dir}")
+
+    def get(self, key):
+        """Возвращает суммаризацию по ключу или None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_LOOKUPS.inc(result="hits")
+                return self._entries[key]
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                CACHE_LOOKUPS.inc(result="misses")
+                return None
+            self.disk_hits += 1
+            CACHE_LOOKUPS.inc(result="disk_hits")
+            self._put_memory(key, value)
+        return value
+
+    def put(self, key, value):
+        """Сохраняет суммаризацию в памяти и на диске."""
+        with self._lock:
+            self._put_memory(key, value)
+        self._write_disk(key, value)
+
+    async def get_async(self, key):
+        """get для event loop: чтение с диска выполняется в отдельном потоке."""
+        return await self._run_io(self.get, key)
+
+    async def put_async(self, key, value):
+        """put для event loop: запись на диск выполняется в отдельном потоке."""
+        await self._run_io(self.put, key, value)
+
+    def lookup(self, keys):
+        """Возвращает список суммаризаций (None для отсутствующих) для списка ключей."""
+        return [self.get(key) for key in keys]
+
+    def store(self, keys, values):
+        """Сохраняет пары ключ-суммаризация."""
+        for key, value in zip(keys, values):
+            self.put(key, value)
+
+    def cached(self, generate, params):
+        """
+        Оборачивает асинхронную функцию генерации кэшем по чанкам.
+
+        Аргументы:
+            1) generate: Асинхронная функция (chunks, on_result=None) -> list[str]
+            2) params (dict): Параметры генерации и ID модели
+
+        Возвращает:
+            Асинхронную функцию с той же сигнатурой, генерирующую только
+            отсутствующие в кэше чанки
+
+        Ключ чанка - его токены, а границы чанков split_text зависят от
+        содержимого предложений. Поэтому после правки документа заново
+        генерируются только чанки рядом с местом правки.
+
+        """
+        async def generate_cached(chunks, on_result=None):
+            keys = [chunk_key(chunk, params) for chunk in chunks]
+            summaries = await self._run_io(self.lookup, keys)
+            missing = [i for i, summary in enumerate(summaries) if summary is None]
+
+            # Найденные в кэше чанки готовы сразу
+            if on_result is not None:
+                for i, summary in enumerate(summaries):
+                    if summary is not None:
+                        on_result(i, summary)
+
+            if missing:
+                # Индексы среди отсутствующих чанков переводим в исходные
+                missing_on_result = None
+                if on_result is not None:
+                    def missing_on_result(j, summary):
+                        on_result(missing[j], summary)
+
+                generated = await generate([chunks[i] for i in missing], missing_on_result)
+                for i, summary in zip(missing, generated):
+                    summaries[i] = summary
+                await self._run_io(self.store, [keys[i] for i in missing], generated)
+            return summaries
+
+        return generate_cached
+
+    def stats(self):
+        """Возвращает размер кэша и счетчики попаданий."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "disk": bool(self.cache_dir),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0,
+            }
+
+    async def _run_io(self, method, *args):
+        """Вызывает метод кэша; с дисковым кэшем - в отдельном потоке."""
+        if not self.cache_dir:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    def _put_memory(self, key, value):
+        """Добавляет значение в LRU и вытесняет старые записи сверх max_bytes."""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key).encode("utf-8"))
+        self._entries[key] = value
+        self._size += size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.encode("utf-8"))
+            self.evictions += 1
+
+    def _path(self, key):
+        """Путь к файлу ключа (с подкаталогом по первым символам хэша)."""
+        return os.path.join(self.cache_dir, key[:2], key + ".txt")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Disk cache read failed: {str(e)}")
+            return None
+
+    def _write_disk(self, key, value):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Пишем во временный файл и атомарно переименовываем
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Disk cache write failed: {str(e)}")
@@ -0,0 +1,211 @@
+"""
+Файл cli.py — Офлайн-суммаризация корпуса из командной строки:
+1) Читает документы из каталога .txt-файлов или из JSONL-файла
+2) Суммаризирует их в пуле процессов через summarize_long_text
+3) Дописывает результаты в выходной JSONL по мере готовности
+4) При повторном запуске пропускает успешно обработанные документы
+   и повторяет документы, завершившиеся ошибкой
+
+Пример запуска (из каталога backend):
+    python -m app.cli corpus/ --output summaries.jsonl --workers 4
+
+"""
+
+# Импорт необходимых библиотек
+import argparse                                   # Разбор аргументов командной строки
+import json                                       # Чтение и запись JSONL
+import logging                                    # Логирование хода обработки
+import os                                         # Работа с файлами и каталогами
+import time                                       # Замер времени обработки
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait  # Пул процессов
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Модель и кэш процесса-обработчика (загружаются один раз на процесс)
+_summarizer = None
+_tokenizer = None
+_cache = None
+
+
+def iter_documents(path):
+    """
+    Лениво перебирает документы корпуса.
+
+    Аргументы:
+        1) path (str): Каталог с .txt-файлами или JSONL-файл
+           (поле "text" и необязательное поле "id" в каждой строке)
+
+    Возвращает:
+        Генератор пар (doc_id, source): для каталога source - путь к файлу
+        (файл читает процесс-обработчик), для JSONL - сам текст
+
+    """
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                if name.endswith(".txt"):
+                    file_path = os.path.join(root, name)
+                    yield os.path.relpath(file_path, path), {"path": file_path}
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                yield str(record.get("id", line_number)), {"text": record["text"]}
+
+
+def read_source(source):
+    """Возвращает текст документа из iter_documents (читает файл, если передан путь)."""
+    if "path" in source:
+        with open(source["path"], encoding="utf-8") as f:
+            return f.read()
+    return source["text"]
+
+
+def load_checkpoint(output_path):
+    """
+    Возвращает ID документов, для которых в выходном файле уже есть суммаризация.
+
+    Строки с ошибкой в контрольную точку не входят: такие документы
+    (например, после временной нехватки памяти) обрабатываются повторно,
+    новая строка дописывается после строки с ошибкой. Недописанная
+    последняя строка (прерванный запуск) отрезается, чтобы новые записи
+    не склеились с ней.
+
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            f.truncate(complete)
+        for line in data[:complete].splitlines():
+            if line.strip():
+                record = json.loads(line)
+                if "error" not in record:
+                    done.add(record["id"])
+    return done
+
+
+def init_worker(threads):
+    """Загружает модель в процессе-обработчике и ограничивает число потоков torch."""
+    global _summarizer, _tokenizer, _cache
+    import torch
+    from app.cache import SummaryCache
+    from app.models import load_summarizer
+
+    # Потоки torch делятся между процессами, чтобы они не конкурировали за ядра
+    torch.set_num_threads(threads)
+    _summarizer, _tokenizer = load_summarizer()
+    # Дисковый кэш (CACHE_DIR) общий для всех процессов и запусков
+    _cache = SummaryCache()
+
+
+def process_document(doc_id, source, extract_tokens=None, extract_ratio=None, profile="default"):
+    """Суммаризирует один документ в процессе-обработчике."""
+    from app.models import generation_options, summarize_long_text
+
+    started = time.perf_counter()
+    try:
+        text = read_source(source)
+        summary = summarize_long_text(text, _summarizer, _tokenizer, cache=_cache,
+                                      extract_tokens=extract_tokens, extract_ratio=extract_ratio,
+                                      options=generation_options(profile))
+        result = {"id": doc_id, "summary": summary}
+    except Exception as e:
+        result = {"id": doc_id, "error": str(e)}
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run(input_path, output_path, workers, max_pending, extract_tokens=None, extract_ratio=None,
+        profile="default"):
+    """
+    Суммаризирует корпус и дописывает результаты в output_path.
+
+    Аргументы:
+        1) input_path (str): Каталог .txt-файлов или JSONL-файл
+        2) output_path (str): Выходной JSONL (он же контрольная точка)
+        3) workers (int): Количество процессов-обработчиков
+        4) max_pending (int): Максимум документов в обработке (ограничивает память)
+        5) extract_tokens (int): Бюджет экстрактивного отбора в токенах (None - без отбора)
+        6) extract_ratio (float): Доля токенов документа после отбора (None - без отбора)
+        7) profile (str): Профиль генерации (default - beam search, fast - жадное декодирование)
+
+    """
+    done = load_checkpoint(output_path)
+    if done:
+        logger.info(f"Resuming: {len(done)} documents already processed")
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    processed = 0
+    failed = 0
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as output, \
+            ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                initargs=(threads,)) as pool:
+        pending = set()
+
+        def write_finished(finished):
+            nonlocal processed, failed
+            for future in finished:
+                result = future.result()
+                # Каждая запись сразу сбрасывается на диск - это и есть контрольная точка
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+                processed += 1
+                failed += "error" in result
+                if processed % 100 == 0:
+                    rate = processed / (time.perf_counter() - started)
+                    logger.info(f"Processed {processed} documents ({rate:.2f} docs/s)")
+
+        for doc_id, source in iter_documents(input_path):
+            if doc_id in done:
+                continue
+            # Не читаем корпус дальше, пока в обработке max_pending документов
+            if len(pending) >= max_pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write_finished(finished)
+            pending.add(pool.submit(process_document, doc_id, source,
+                                    extract_tokens, extract_ratio, profile))
+
+        finished, _ = wait(pending)
+        write_finished(finished)
+
+    logger.info(
+        f"Done: {processed} documents ({failed} failed) in "
+        f"{time.perf_counter() - started:.1f}s"
+    )
+
+
+def main():
+    """Точка входа командной строки."""
+    from app.models import GENERATION_PROFILES
+
+    parser = argparse.ArgumentParser(description="Офлайн-суммаризация корпуса документов")
+    parser.add_argument("input", help="Каталог с .txt-файлами или JSONL-файл (поля id, text)")
+    parser.add_argument("--output", required=True, help="Выходной JSONL-файл (поля id, summary)")
+    parser.add_argument("--workers", type=int, default=1, help="Количество процессов")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Максимум документов в обработке (по умолчанию 4 на процесс)")
+    parser.add_argument("--extract-tokens", type=int, default=None,
+                        help="Экстрактивный отбор предложений до бюджета в токенах")
+    parser.add_argument("--extract-ratio", type=float, default=None,
+                        help="Экстрактивный отбор предложений до доли токенов документа (0-1]")
+    parser.add_argument("--profile", choices=GENERATION_PROFILES, default="default",
+                        help="Профиль генерации: default - beam search, fast - жадное декодирование")
+    args = parser.parse_args()
+
+    run(args.input, args.output, args.workers, args.max_pending or args.workers * 4,
+        args.extract_tokens, args.extract_ratio, args.profile)
+
+
+# Запуск при прямом выполнении модуля
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Файл extractive.py — Экстрактивный предварительный отбор предложений:
+1) Разбивает текст на предложения и строит разреженную матрицу TF-IDF
+2) Оценивает центральность предложений (TextRank) векторными операциями NumPy
+3) Оставляет лучшие предложения в пределах бюджета токенов в исходном порядке
+4) Сокращенный текст затем суммаризирует модель (разбиение на части и map-reduce)
+
+Матрица сходства предложений не строится целиком: умножение на нее
+выполняется как X @ (X.T @ v), поэтому память растет линейно с длиной текста.
+
+"""
+
+# Импорт необходимых библиотек
+import re                                         # Разбиение предложений на слова
+import numpy as np                                # Векторная оценка предложений
+from app.models import SENTENCE_BOUNDARY          # Граница предложения (как при разбиении текста)
+
+# Слово для TF-IDF: буквы и цифры в нижнем регистре
+WORD = re.compile(r'\w+')
+
+# Параметры TextRank
+DAMPING = 0.85        # Вероятность перехода по ребру графа предложений
+MAX_ITERATIONS = 50   # Максимум итераций степенного метода
+TOLERANCE = 1e-6      # Порог сходимости (сумма изменений оценок)
+
+
+def split_sentences(text):
+    """Разбивает текст на непустые предложения."""
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+
+def tfidf_matrix(sentences):
+    """
+    Строит матрицу TF-IDF предложений в разреженном виде.
+
+    Аргументы:
+        1) sentences (list): Предложения
+
+    Возвращает:
+        tuple: (rows, cols, values) - ненулевые элементы матрицы (предложение, слово),
+            строки нормированы на единичную длину
+
+    """
+    vocabulary = {}
+    rows, cols, counts = [], [], []
+    for row, sentence in enumerate(sentences):
+        terms = {}
+        for word in WORD.findall(sentence.lower()):
+            column = vocabulary.setdefault(word, len(vocabulary))
+            terms[column] = terms.get(column, 0) + 1
+        rows.extend([row] * len(terms))
+        cols.extend(terms)
+        counts.extend(terms.values())
+
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    # Сглаженный IDF: слова, встречающиеся во всех предложениях, почти не влияют на сходство
+    document_frequency = np.bincount(cols, minlength=len(vocabulary))
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    values = (1 + np.log(np.asarray(counts, dtype=np.float64))) * idf[cols]
+
+    norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=len(sentences)))
+    values /= np.maximum(norms, 1e-12)[rows]
+    return rows, cols, values
+
+
+def textrank_scores(sentences):
+    """
+    Центральность предложений (TextRank) по косинусному сходству TF-IDF.
+
+    Аргументы:
+        1) sentences (list): Предложения
+
+    Возвращает:
+        np.ndarray: Оценка каждого предложения (сумма оценок равна 1)
+
+    """
+    count = len(sentences)
+    rows, cols, values = tfidf_matrix(sentences)
+    self_similarity = np.bincount(rows, weights=values ** 2, minlength=count)
+    vocabulary_size = int(cols.max()) + 1 if len(cols) else 0
+
+    def similarity_dot(vector):
+        # S @ v без самих предложений (диагонали), где S = X @ X.T
+        column_sums = np.bincount(cols, weights=values * vector[rows], minlength=vocabulary_size)
+        return np.bincount(rows, weights=values * column_sums[cols], minlength=count) \
+            - self_similarity * vector
+
+    # Степень вершины: сумма сходств с остальными предложениями
+    degree = similarity_dot(np.ones(count))
+    connected = degree > 1e-12
+    scores = np.full(count, 1 / count)
+    for _ in range(MAX_ITERATIONS):
+        spread = np.where(connected, scores / np.where(connected, degree, 1), 0)
+        updated = (1 - DAMPING) / count + DAMPING * similarity_dot(spread)
+        # Оценки изолированных предложений распределяются поровну между всеми
+        updated += DAMPING * scores[~connected].sum() / count
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+def truncate_tokens(text, tokenizer, max_tokens):
+    """Начало текста из не более чем max_tokens токенов (обрезка по границе токена)."""
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)['offset_mapping']
+    if len(offsets) <= max_tokens:
+        return text
+    return text[:offsets[max_tokens - 1][1]].rstrip()
+
+
+def condense(text, tokenizer, max_tokens=None, ratio=None):
+    """
+    Оставляет самые центральные предложения текста в пределах бюджета токенов.
+
+    Аргументы:
+        1) text (str): Исходный текст
+        2) tokenizer: Токенизатор модели (бюджет считается в его токенах)
+        3) max_tokens (int): Бюджет в токенах (None - не ограничен)
+        4) ratio (float): Доля токенов исходного текста от 0 до 1 (None - не ограничена);
+           если заданы оба ограничения, действует меньшее
+
+    Возвращает:
+        str: Выбранные предложения в исходном порядке (или весь текст,
+            если он помещается в бюджет; если не помещается ни одно
+            предложение - самое центральное, обрезанное до бюджета)
+
+    """
+    sentences = split_sentences(text)
+    if len(sentences) < 2:
+        return text
+
+    input_ids = tokenizer(sentences, add_special_tokens=False)['input_ids']
+    lengths = np.array([len(ids) for ids in input_ids])
+    total = int(lengths.sum())
+    budget = total
+    if max_tokens is not None:
+        budget = min(budget, max_tokens)
+    if ratio is not None:
+        budget = min(budget, int(total * ratio))
+    if budget >= total:
+        return text
+
+    # Предложения по убыванию оценки; не помещающиеся в остаток бюджета пропускаем
+    order = np.argsort(-textrank_scores(sentences), kind="stable")
+    selected = []
+    remaining = budget
+    for index in order:
+        if lengths[index] <= remaining:
+            selected.append(index)
+            remaining -= lengths[index]
+    # Ни одно предложение не помещается: начало самого центрального в пределах бюджета
+    if not selected:
+        return truncate_tokens(sentences[order[0]], tokenizer, max(budget, 1))
+    return ' '.join(sentences[index] for index in sorted(selected))
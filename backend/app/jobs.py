@@ -0,0 +1,480 @@
+"""
+Файл jobs.py — Асинхронные задачи суммаризации больших документов:
+1) Хранит задачи и готовые суммаризации их чанков в SQLite
+2) Выполняет задачи фоновыми обработчиками, не держа HTTP-соединение
+3) После перезапуска продолжает задачу с уже готовых чанков
+4) Сообщает прогресс (уровень дерева, готовые чанки) и итоговый результат
+5) Удаляет завершенные задачи старше JOB_RETENTION_SECONDS
+
+Методы JobStore синхронные; из event loop они вызываются через
+asyncio.to_thread, чтобы ожидание блокировки базы (busy_timeout) не
+останавливало обработку остальных запросов процесса.
+
+Несколько процессов (app.serve) работают с одной базой: задачу забирает
+один обработчик, а задачи остановившегося процесса перестают обновлять
+отметку активности и через JOB_STALE_SECONDS забираются заново.
+
+"""
+
+# Импорт необходимых библиотек
+import asyncio                                    # Фоновые обработчики задач
+import json                                       # Параметры запроса и уровни в JSON
+import logging                                    # Логирование выполнения задач
+import os                                         # Для чтения настроек из переменных окружения
+import sqlite3                                    # Хранилище задач
+import threading                                  # Блокировка соединения с базой
+import time                                       # Отметки времени задач
+import uuid                                       # ID задач
+from app.scheduler import QueueFullError          # Очередь модели переполнена - повторяем позже
+
+logger = logging.getLogger(__name__)
+
+# Настройки задач
+JOBS_DB = os.getenv("JOBS_DB", "jobs.sqlite3")                      # Файл базы задач
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))                      # Задач в работе на процесс
+JOB_CHUNK_SLICE = int(os.getenv("JOB_CHUNK_SLICE", 32))             # Чанков задачи в очереди модели
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1))          # Проверка новых задач в базе
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", 5))  # Отметка активности задачи
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", 30))       # Задача без отметки - ничья
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", 7 * 24 * 3600))  # Хранение результатов (0 - всегда)
+JOB_CLEANUP_SECONDS = float(os.getenv("JOB_CLEANUP_SECONDS", 3600))  # Период удаления старых задач
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,            -- queued, running, done, failed
+    request TEXT NOT NULL,           -- параметры запроса (JSON)
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    heartbeat REAL,                  -- последняя отметка активности обработчика
+    level INTEGER,                   -- текущий уровень дерева
+    chunks_done INTEGER,             -- готовые чанки уровня
+    chunks_total INTEGER,            -- все чанки уровня
+    summary TEXT,
+    levels TEXT,                     -- статистика уровней (JSON)
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    PRIMARY KEY (job_id, level, idx)
+);
+"""
+
+
+class JobStore:
+    """
+    Хранилище задач и готовых чанков в SQLite.
+
+    Аргументы:
+        1) path (str): Файл базы
+
+    """
+
+    def __init__(self, path=JOBS_DB):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Соединение используют event loop и потоки - доступ через блокировку
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            # WAL: чтение прогресса не ждет записи чанков, NORMAL - без fsync на каждую запись
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("PRAGMA busy_timeout=5000")
+            self._connection.executescript(SCHEMA)
+
+    def _execute(self, sql, parameters=()):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def create(self, request):
+        """Создает задачу со статусом queued и возвращает ее ID."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, status, request, created, updated) VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, json.dumps(request, ensure_ascii=False), now, now)
+        )
+        return job_id
+
+    def get(self, job_id):
+        """Возвращает статус, прогресс и результат задачи (None - задачи нет)."""
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        row = rows[0]
+        job = {
+            "id": row["id"],
+            "status": row["status"],
+            "created": row["created"],
+            "updated": row["updated"],
+            "progress": {
+                "level": row["level"],
+                "chunks_done": row["chunks_done"],
+                "chunks_total": row["chunks_total"],
+            },
+        }
+        if row["status"] == "done":
+            job["summary"] = row["summary"]
+            job["levels"] = json.loads(row["levels"])
+        elif row["status"] == "failed":
+            job["error"] = row["error"]
+        return job
+
+    def count(self, status):
+        """Количество задач с указанным статусом."""
+        return self._execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,))[0][0]
+
+    def claim(self, stale_seconds=JOB_STALE_SECONDS):
+        """
+        Забирает самую старую задачу в работу.
+
+        Задачи running без отметки активности дольше stale_seconds
+        (процесс остановлен или упал) забираются заново.
+
+        Возвращает:
+            tuple: (job_id, request) или None, если задач нет
+
+        """
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE: другой процесс не заберет ту же задачу между SELECT и UPDATE
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT id, request FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND heartbeat < ?) ORDER BY created LIMIT 1",
+                    (now - stale_seconds,)
+                ).fetchone()
+                if row is not None:
+                    self._connection.execute(
+                        "UPDATE jobs SET status = 'running', heartbeat = ?, updated = ? WHERE id = ?",
+                        (now, now, row["id"])
+                    )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return row["id"], json.loads(row["request"])
+
+    def heartbeat(self, job_ids):
+        """Обновляет отметку активности задач в работе."""
+        now = time.time()
+        for job_id in job_ids:
+            self._execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (now, job_id))
+
+    def release(self, job_ids):
+        """Возвращает задачи в очередь (готовые чанки сохраняются)."""
+        for job_id in job_ids:
+            self._execute(
+                "UPDATE jobs SET status = 'queued', updated = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id)
+            )
+
+    def chunks(self, job_id, level):
+        """Готовые суммаризации чанков уровня: {index: summary}."""
+        rows = self._execute(
+            "SELECT idx, summary FROM job_chunks WHERE job_id = ? AND level = ?", (job_id, level)
+        )
+        return {row["idx"]: row["summary"] for row in rows}
+
+    def progress(self, job_id, level, done, total):
+        """Записывает прогресс задачи."""
+        self._execute(
+            "UPDATE jobs SET level = ?, chunks_done = ?, chunks_total = ?, updated = ? WHERE id = ?",
+            (level, done, total, time.time(), job_id)
+        )
+
+    def save_chunks(self, job_id, level, summaries, done, total):
+        """Сохраняет готовые суммаризации чанков [(index, summary)] и прогресс одной транзакцией."""
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO job_chunks (job_id, level, idx, summary) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(job_id, level, index, summary) for index, summary in summaries]
+                )
+                self._connection.execute(
+                    "UPDATE jobs SET level = ?, chunks_done = ?, chunks_total = ?, updated = ? "
+                    "WHERE id = ?",
+                    (level, done, total, time.time(), job_id)
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def finish(self, job_id, summary, levels):
+        """Сохраняет результат задачи и удаляет ее промежуточные чанки."""
+        self._execute(
+            "UPDATE jobs SET status = 'done', summary = ?, levels = ?, updated = ? WHERE id = ?",
+            (summary, json.dumps(levels), time.time(), job_id)
+        )
+        self._execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+
+    def fail(self, job_id, error):
+        """Помечает задачу как неудачную и удаляет ее промежуточные чанки."""
+        self._execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+            (error, time.time(), job_id)
+        )
+        self._execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+
+    def cleanup(self, retention_seconds=JOB_RETENTION_SECONDS):
+        """
+        Удаляет завершенные (done, failed) задачи, не менявшиеся дольше retention_seconds.
+
+        Возвращает:
+            int: Количество удаленных задач
+
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?",
+                (time.time() - retention_seconds,)
+            )
+            return cursor.rowcount
+
+    def checkpoint(self, job_id, slice_size=JOB_CHUNK_SLICE):
+        """
+        Возвращает обертку функции генерации, сохраняющую готовые чанки задачи.
+
+        Каждый вызов generate в summarize_tree - один уровень дерева, поэтому
+        уровень определяется порядковым номером вызова. Чанки, сохраненные
+        до перезапуска, в модель не отправляются. Остальные отправляются
+        частями по slice_size, чтобы большая задача не занимала всю очередь
+        модели и не упиралась в ее размер. Готовые чанки записываются в базу
+        пачками в отдельном потоке (_ChunkWriter), а не в callback каждого чанка.
+
+        Аргументы:
+            1) job_id (str): ID задачи
+            2) slice_size (int): Чанков задачи в очереди модели одновременно
+
+        Возвращает:
+            Функцию generate -> generate с той же сигнатурой
+            (chunks, on_result=None) -> list[str]
+
+        """
+        level = 0
+
+        def wrap(generate):
+            async def generate_resumable(chunks, on_result=None):
+                nonlocal level
+                current = level
+                level += 1
+
+                summaries = [None] * len(chunks)
+                saved = await asyncio.to_thread(self.chunks, job_id, current)
+                for index, summary in saved.items():
+                    summaries[index] = summary
+                missing = [i for i, summary in enumerate(summaries) if summary is None]
+                writer = _ChunkWriter(self, job_id, current, len(chunks) - len(missing), len(chunks))
+                await asyncio.to_thread(self.progress, job_id, current, writer.done, len(chunks))
+
+                # Сохраненные до перезапуска чанки готовы сразу
+                if on_result is not None:
+                    for i, summary in enumerate(summaries):
+                        if summary is not None:
+                            on_result(i, summary)
+
+                try:
+                    for start in range(0, len(missing), slice_size):
+                        part = missing[start:start + slice_size]
+
+                        def save(j, summary, part=part):
+                            writer.add(part[j], summary)
+                            if on_result is not None:
+                                on_result(part[j], summary)
+
+                        while True:
+                            try:
+                                generated = await generate([chunks[i] for i in part], save)
+                                break
+                            except QueueFullError:
+                                # Очередь занята интерактивными запросами - задача подождет
+                                await asyncio.sleep(JOB_POLL_SECONDS)
+                        for i, summary in zip(part, generated):
+                            summaries[i] = summary
+                finally:
+                    # Уровень готов, когда все его чанки записаны в базу; чанки,
+                    # готовые до ошибки или отмены, тоже сохраняются
+                    await writer.wait()
+                return summaries
+
+            return generate_resumable
+
+        return wrap
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class _ChunkWriter:
+    """
+    Записывает готовые чанки уровня задачи в базу пачками.
+
+    add() вызывается из callback готовности чанка и только добавляет его
+    в очередь записи; запись идет фоновой задачей в отдельном потоке и
+    забирает все чанки, готовые к ее началу, одной транзакцией.
+
+    """
+
+    def __init__(self, store, job_id, level, done, total):
+        self.store = store
+        self.job_id = job_id
+        self.level = level
+        self.done = done                  # Чанков уровня в базе (с учетом записываемых)
+        self.total = total
+        self._pending = []                # Чанки, ожидающие записи: [(index, summary)]
+        self._task = None                 # Фоновая задача записи
+
+    def add(self, index, summary):
+        self._pending.append((index, summary))
+        # После ошибки записи новую задачу не запускаем: ошибку вернет wait()
+        if self._task is None or (self._task.done() and self._task.exception() is None):
+            self._task = asyncio.get_running_loop().create_task(self._flush())
+
+    async def wait(self):
+        """Ждет записи всех добавленных чанков (ошибка базы пробрасывается)."""
+        if self._task is not None:
+            await self._task
+
+    async def _flush(self):
+        while self._pending:
+            summaries, self._pending = self._pending, []
+            self.done += len(summaries)
+            await asyncio.to_thread(self.store.save_chunks, self.job_id, self.level,
+                                    summaries, self.done, self.total)
+
+
+class JobRunner:
+    """
+    Фоновые обработчики задач.
+
+    Аргументы:
+        1) store (JobStore): Хранилище задач
+        2) run_fn: Асинхронная функция (request, checkpoint) -> (summary, levels),
+           где checkpoint - обертка generate из JobStore.checkpoint
+        3) workers (int): Количество задач в работе одновременно
+        4) retention_seconds (float): Сколько хранить завершенные задачи (0 - всегда)
+
+    Ошибки базы (например, "database is locked") не останавливают обработчики:
+    они записываются в лог, и действие повторяется позже. Задача, результат
+    которой не удалось сохранить, перестает получать отметку активности и
+    забирается заново с сохраненных чанков.
+
+    """
+
+    def __init__(self, store, run_fn, workers=JOB_WORKERS, retention_seconds=JOB_RETENTION_SECONDS):
+        self.store = store
+        self.run_fn = run_fn
+        self.workers = workers
+        self.retention_seconds = retention_seconds
+        self.running = set()              # ID задач в работе в этом процессе
+        self._tasks = []
+        self._wakeup = None               # Создается в start() внутри event loop
+
+    async def start(self):
+        """Запускает обработчики и отметку активности задач."""
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info(f"Job runner started: {self.workers} workers, store {self.store.path}")
+
+    async def stop(self):
+        """Останавливает обработчики и возвращает незавершенные задачи в очередь."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # После перезапуска задачи продолжатся с сохраненных чанков
+        await asyncio.to_thread(self.store.release, list(self.running))
+
+    def notify(self):
+        """Сообщает обработчикам о новой задаче."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self):
+        """Цикл обработчика: забрать задачу из базы или ждать новую."""
+        while True:
+            try:
+                claimed = await asyncio.to_thread(self.store.claim)
+            except Exception as e:
+                logger.error(f"Job claim failed: {str(e)}")
+                await asyncio.sleep(JOB_POLL_SECONDS)
+                continue
+            if claimed is None:
+                # Задачи других процессов и зависшие задачи видны только через базу
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            job_id, request = claimed
+            self.running.add(job_id)
+            logger.info(f"Job {job_id} started")
+            try:
+                summary, levels = await self.run_fn(request, self.store.checkpoint(job_id))
+            except asyncio.CancelledError:
+                raise
+            except sqlite3.Error as e:
+                # Ошибка базы, а не задачи: задача продолжится с сохраненных чанков
+                logger.error(f"Job {job_id} interrupted by store error: {str(e)}")
+                self.running.discard(job_id)
+                await self._release(job_id)
+                await asyncio.sleep(JOB_POLL_SECONDS)
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+                self.running.discard(job_id)
+                await self._save(self.store.fail, job_id, str(e))
+            else:
+                self.running.discard(job_id)
+                if await self._save(self.store.finish, job_id, summary, levels):
+                    logger.info(f"Job {job_id} finished")
+
+    async def _save(self, method, job_id, *args):
+        """Сохраняет итог задачи; при ошибке базы задачу заберут заново после JOB_STALE_SECONDS."""
+        try:
+            await asyncio.to_thread(method, job_id, *args)
+            return True
+        except Exception as e:
+            logger.error(f"Job {job_id} result not saved: {str(e)}")
+            return False
+
+    async def _release(self, job_id):
+        """Возвращает задачу в очередь; при ошибке базы ее заберут после JOB_STALE_SECONDS."""
+        try:
+            await asyncio.to_thread(self.store.release, [job_id])
+        except Exception as e:
+            logger.error(f"Job {job_id} not released: {str(e)}")
+
+    async def _heartbeat(self):
+        """Периодически отмечает задачи этого процесса как активные и удаляет старые задачи."""
+        # Отметка должна обновляться заметно чаще, чем задача считается зависшей
+        interval = min(JOB_HEARTBEAT_SECONDS, JOB_STALE_SECONDS / 3)
+        cleaned = None
+        while True:
+            try:
+                await asyncio.to_thread(self.store.heartbeat, list(self.running))
+                if self.retention_seconds and (cleaned is None
+                                               or time.monotonic() - cleaned >= JOB_CLEANUP_SECONDS):
+                    removed = await asyncio.to_thread(self.store.cleanup, self.retention_seconds)
+                    cleaned = time.monotonic()
+                    if removed:
+                        logger.info(f"Removed {removed} finished jobs")
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+            await asyncio.sleep(interval)
@@ -8,58 +8,226 @@
 """
 
 # Импорт необходимых библиотек
-from fastapi import FastAPI                       # Веб-фреймворк для создания API
-from pydantic import BaseModel                    # Для валидации входных данных
-from transformers import pipeline, BartTokenizer  # NLP модели и токенизатор
-import torch                                      # Для работы с GPU/CPU
-import re                                         # Регулярные выражения
+from fastapi import FastAPI, HTTPException, Request  # Веб-фреймворк для создания API
+from fastapi.encoders import jsonable_encoder     # Сохранение параметров запроса задачи
+from fastapi.responses import PlainTextResponse, StreamingResponse  # Метрики и потоковая отдача
+from starlette.routing import Match               # Определение маршрута для меток метрик
+from pydantic import BaseModel, Field             # Для валидации входных данных
+import asyncio                                    # Очереди, задачи и семафоры обработки запросов
+import functools                                  # Привязка параметров генерации к очереди модели
+import json                                       # Сериализация событий в NDJSON
 import logging                                    # Логирование работы приложения
+import os                                         # Для чтения настроек из переменных окружения
+import time                                       # Замер длительности этапов запуска
+from contextlib import asynccontextmanager        # Жизненный цикл приложения (lifespan)
+from typing import List, Literal, Optional        # Типы полей моделей запросов
+from app.models import (                          # Загрузка модели, дерево суммаризации и генерация
+    GENERATION_PROFILES, INFERENCE_BACKEND, MAX_MODEL_LENGTH, MODEL_NAME, document_params,
+    budget_generation_options, generation_key, generation_options, generation_params,
+    load_summarizer, require_text, summarize_chunks, summarize_tree, warm_up
+)
+from app.cache import SummaryCache, document_key  # Кэш суммаризаций
+from app.scheduler import InferenceScheduler, QueueFullError  # Динамический батчинг запросов
+from app.jobs import JobRunner, JobStore          # Асинхронные задачи для больших документов
+from app import metrics                           # Метрики Prometheus и время этапов
 
 # Настройка логирования (уровень INFO для отображения важных событий)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)              # Создание логгера
 
-# Создание FastAPI приложения
-app = FastAPI()
+# Модель и токенизатор (могут быть заранее загружены в общую память, см. app/serve.py)
+summarizer = None
+tokenizer = None
+scheduler = None
+cache = None
+jobs = None
+job_runner = None
+
+# Состояние запуска: готовность к обработке запросов, ошибка и длительность этапов
+startup_state = {"ready": False, "error": None, "phases": {}}
 
-# Константы для настройки модели суммаризации
-MAX_MODEL_LENGTH = 1024                # Максимальная длина входного текста в токенах
-SUMMARY_LENGTH = 150                   # Желаемая длина суммаризированного текста
-MIN_SUMMARY_LENGTH = 30                # Минимальная длина суммаризированного текста
-OVERLAP_SIZE = 50                      # Размер перекрытия между чанками текста
+# Ограничения пакетной суммаризации
+MAX_BATCH_DOCUMENTS = int(os.getenv("MAX_BATCH_DOCUMENTS", 256))  # Максимум документов в запросе
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 16))       # Документов в обработке одновременно
+BATCH_RETRY_SECONDS = float(os.getenv("BATCH_RETRY_SECONDS", 1))  # Пауза перед повтором при полной очереди
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", 1000))         # Максимум задач в очереди
 
 
-# Загрузка модели при старте приложения
-@app.on_event("startup")
+# Загрузка и прогрев модели (выполняется в фоне, пока приложение уже отвечает на /health/live)
 async def load_model():
-    global summarizer, tokenizer        # Делаем переменные доступными глобально
+    global summarizer, tokenizer, scheduler, cache, job_runner  # Делаем переменные доступными глобально
+    phases = startup_state["phases"]
+    started = time.perf_counter()
     try:
-        logger.info("Starting model loading...")
-        # Инициализация токенизатора BART для CNN модели
-        tokenizer = BartTokenizer.from_pretrained('facebook/bart-large-cnn')
-        logger.info("Tokenizer loaded")
-
-        # Определение доступного устройства (GPU если доступен, иначе CPU)
-        device = 0 if torch.cuda.is_available() else -1
-        logger.info(f"Using device: {'GPU' if device == 0 else 'CPU'}")
-
-        # Инициализация пайплайна для суммаризации текста
-        summarizer = pipeline(
-            "summarization",                   # Тип задачи
-            model="facebook/bart-large-cnn",        # Используемая модель
-            tokenizer=tokenizer,                    # Токенизатор
-            device=device                           # Устройство для вычислений
+        if summarizer is None:
+            logger.info(f"Starting model loading: {MODEL_NAME} (backend: {INFERENCE_BACKEND})")
+            # Быстрый токенизатор BART и модель выбранного бэкенда (INFERENCE_BACKEND);
+            # загрузка идет в отдельном потоке, чтобы не блокировать event loop
+            summarizer, tokenizer = await asyncio.to_thread(load_summarizer)
+            phases["load_model"] = round(time.perf_counter() - started, 3)
+            logger.info(f"Model successfully loaded in {phases['load_model']}s")
+        else:
+            # Модель загружена главным процессом до fork - веса общие для всех процессов
+            logger.info("Using preloaded shared model")
+
+        # Прогрев генерации на входах разной длины (WARMUP_LENGTHS)
+        phase_started = time.perf_counter()
+        phases["warmup_lengths"] = await asyncio.to_thread(warm_up, summarizer, tokenizer)
+        phases["warmup"] = round(time.perf_counter() - phase_started, 3)
+        logger.info(f"Warm-up finished in {phases['warmup']}s: {phases['warmup_lengths']}")
+
+        # Запуск планировщика, объединяющего чанки разных запросов в батчи
+        # Группа планировщика - ровно один вызов модели: группы строятся по параметрам
+        # generate каждого чанка, и summarize_chunks не делит группу на батчи повторно
+        scheduler = InferenceScheduler(
+            lambda chunks, options: summarize_chunks(
+                chunks, summarizer, tokenizer, batch_size=len(chunks), options=options
+            ),
+            batch_key=lambda chunk, options: generation_key(len(chunk), options)
         )
-        logger.info("Model successfully loaded")
+        await scheduler.start()
+
+        # Кэш суммаризаций документов и чанков (память + опционально диск)
+        cache = SummaryCache()
+
+        # Асинхронные задачи: незавершенные задачи прошлого запуска продолжатся сами
+        if jobs is not None:
+            job_runner = JobRunner(jobs, run_job)
+            await job_runner.start()
+
+        phases["total"] = round(time.perf_counter() - started, 3)
+        startup_state["ready"] = True
+        logger.info(f"Ready to serve in {phases['total']}s")
     except Exception as e:
         logger.error(f"Model loading failed: {str(e)}")
-        # Прерываем запуск приложения при ошибке загрузки модели
-        raise
+        # Ошибка запуска видна в /health/live и /health/ready
+        startup_state["error"] = str(e)
+
+
+# Жизненный цикл приложения: фоновая загрузка модели и остановка планировщика
+@asynccontextmanager
+async def lifespan(app):
+    global jobs
+    # Хранилище задач открывается до загрузки модели: статус задач доступен сразу после запуска
+    try:
+        jobs = await asyncio.to_thread(JobStore)
+    except Exception as e:
+        logger.error(f"Job store unavailable: {str(e)}")
+    loading = asyncio.create_task(load_model())
+    # Несколько процессов app.serve: снимок метрик для общего /metrics
+    flushing = asyncio.create_task(flush_metrics()) if metrics.METRICS_DIR else None
+    yield
+    loading.cancel()
+    if flushing is not None:
+        flushing.cancel()
+    if job_runner is not None:
+        await job_runner.stop()
+    if scheduler is not None:
+        await scheduler.stop()
+
+
+# Периодическая запись снимка метрик процесса в METRICS_DIR
+async def flush_metrics():
+    while True:
+        await asyncio.sleep(metrics.METRICS_FLUSH_SECONDS)
+        update_gauges()
+        try:
+            await asyncio.to_thread(metrics.write_snapshot)
+        except OSError as e:
+            logger.warning(f"Metrics snapshot failed: {str(e)}")
+
+
+# Текущие значения gauge-метрик процесса
+def update_gauges():
+    if scheduler is not None:
+        metrics.QUEUE_DEPTH.set(scheduler.stats()["queue_depth"])
+    if cache is not None:
+        metrics.CACHE_BYTES.set(cache.stats()["bytes"])
+
+
+# Создание FastAPI приложения
+app = FastAPI(lifespan=lifespan)
+
+
+# Метрики HTTP: количество запросов по статусам и задержка по маршрутам.
+# Задержка считается до конца тела ответа: для потоковых маршрутов (/summarize/stream)
+# заголовки уходят сразу, а суммаризация продолжается, пока передается тело
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    endpoint = route_path(request.scope)
+    body = response.body_iterator
+
+    async def record_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            metrics.REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+
+    response.body_iterator = record_body()
+    return response
+
+
+# Шаблон пути маршрута (а не сам путь), чтобы число меток не росло с каждым URL
+def route_path(scope):
+    route = scope.get("route")
+    if route is None:
+        route = next((route for route in app.routes
+                      if route.matches(scope)[0] == Match.FULL), None)
+    return route.path if route is not None else "unmatched"
+
+
+# Проверка готовности модели для endpoints, которые ее используют
+def require_ready():
+    if not startup_state["ready"]:
+        raise HTTPException(
+            status_code=503,
+            detail=startup_state["error"] or "Модель загружается",
+            headers={"Retry-After": "5"}
+        )
+
+
+# Проверка хранилища задач для endpoints /jobs
+def require_jobs():
+    if jobs is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Хранилище задач недоступно",
+            headers={"Retry-After": "5"}
+        )
+
+
+# Параметры суммаризации, общие для всех endpoints (None - значение по умолчанию)
+class SummarizationOptions(BaseModel):
+    # Экстрактивный отбор предложений перед моделью (None - весь текст идет в модель)
+    extract_tokens: Optional[int] = Field(None, gt=0)         # Бюджет отбора в токенах
+    extract_ratio: Optional[float] = Field(None, gt=0, le=1)  # Доля токенов текста
+    # Генерация: профиль и явные значения, которые его переопределяют
+    profile: Literal[tuple(GENERATION_PROFILES)] = "default"  # default - beam search, fast - жадный
+    target_length: Optional[int] = Field(None, gt=0, le=MAX_MODEL_LENGTH)  # Макс. длина суммаризации части
+    target_ratio: Optional[float] = Field(None, gt=0, le=1)   # Макс. длина от длины части
+    num_beams: Optional[int] = Field(None, ge=1, le=16)       # Количество лучей beam search
+    greedy: bool = False                                       # Жадное декодирование
+    latency_budget: Optional[float] = Field(None, gt=0)        # Бюджет времени на дерево (декодирование и уровни), с
 
 
 # Модель запроса для валидации входных данных
-class TextRequest(BaseModel):
-    text: str                        # Единственное поле - текст для суммаризации
+class TextRequest(SummarizationOptions):
+    text: str                        # Текст для суммаризации
+    include_timings: bool = False    # Вернуть разбивку времени по этапам
+
+
+# Модель запроса пакетной суммаризации (параметры общие для всех текстов)
+class BatchRequest(SummarizationOptions):
+    texts: List[str]                 # Тексты для суммаризации
+
+
+# Модель запроса асинхронной задачи
+class JobRequest(SummarizationOptions):
+    text: str                        # Текст для суммаризации
 
 
 # Корневой endpoint для проверки работы API
@@ -72,84 +240,304 @@ async def root():
                 "method": "POST",
                 "path": "/summarize",
                 "description": "Generate text summary"
+            },
+            "summarize_batch": {
+                "method": "POST",
+                "path": "/summarize/batch",
+                "description": "Summarize many documents in one request"
+            },
+            "summarize_stream": {
+                "method": "POST",
+                "path": "/summarize/stream",
+                "description": "Stream chunk summaries and the final summary as NDJSON"
+            },
+            "jobs_create": {
+                "method": "POST",
+                "path": "/jobs",
+                "description": "Queue a large document, returns a job ID immediately"
+            },
+            "jobs_get": {
+                "method": "GET",
+                "path": "/jobs/{job_id}",
+                "description": "Job status, progress and result"
+            },
+            "scheduler": {
+                "method": "GET",
+                "path": "/scheduler",
+                "description": "Inference queue depth and batch statistics"
+            },
+            "cache": {
+                "method": "GET",
+                "path": "/cache",
+                "description": "Summary cache size and hit/miss counters"
+            },
+            "metrics": {
+                "method": "GET",
+                "path": "/metrics",
+                "description": "Prometheus metrics: stage latency, tokens, queue and cache"
+            },
+            "health_live": {
+                "method": "GET",
+                "path": "/health/live",
+                "description": "Liveness probe: the process is up"
+            },
+            "health_ready": {
+                "method": "GET",
+                "path": "/health/ready",
+                "description": "Readiness probe: the model is loaded and warmed up"
             }
         }
     }
 
 
-# Функция для разбиения длинного текста на чанки
-def split_text(text, tokenizer, max_length=MAX_MODEL_LENGTH, overlap=OVERLAP_SIZE):
-    # Разбиваем текст на предложения с помощью регулярных выражений
-    sentences = re.split(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s', text)
-    chunks = []                       # Список для хранения чанков
-    current_chunk = []                # Текущий формируемый чанк
-    current_length = 0                # Длина текущего чанка в токенах
-
-    # Формируем чанки с учетом максимальной длины
-    for sentence in sentences:
-        sentence_length = len(tokenizer.tokenize(sentence))  # Длина предложения в токенах
-        # Если предложение помещается в текущий чанк
-        if current_length + sentence_length <= max_length:
-            current_chunk.append(sentence)
-            current_length += sentence_length
-        else:
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))        # Добавляем готовый чанк
-                # Сохраняем перекрытие для сохранения контекста между чанками
-                current_chunk = current_chunk[-overlap:] if overlap > 0 else []
-                current_chunk.append(sentence)
-                current_length = sum(len(tokenizer.tokenize(s)) for s in current_chunk)
+# Liveness: процесс работает (модель может еще загружаться)
+@app.get("/health/live")
+async def health_live():
+    if startup_state["error"]:
+        raise HTTPException(status_code=500, detail=startup_state["error"])
+    return {"status": "alive"}
+
+
+# Readiness: модель загружена и прогрета, можно направлять запросы
+@app.get("/health/ready")
+async def health_ready():
+    require_ready()
+    return {"status": "ready", "phases": startup_state["phases"]}
+
 
-    # Добавляем последний чанк, если он не пустой
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-    return chunks
+# Состояние очереди модели и статистика батчей
+@app.get("/scheduler")
+async def scheduler_stats():
+    require_ready()
+    return scheduler.stats()
+
+
+# Размер кэша суммаризаций и счетчики попаданий
+@app.get("/cache")
+async def cache_stats():
+    require_ready()
+    return cache.stats()
+
+
+# Метрики в текстовом формате Prometheus (при нескольких процессах app.serve - сумма по процессам)
+@app.get("/metrics")
+async def metrics_endpoint():
+    update_gauges()
+    # С METRICS_DIR render читает снимки процессов с диска - вне event loop
+    text = await asyncio.to_thread(metrics.render)
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+
+# Суммаризация текста с кэшем документов и чанков
+async def run_summarization(text, options, on_summary=None, timings=None, checkpoint=None,
+                            wait_for_queue=False):
+    # Этапы запроса записываются в timings (None - только в общие метрики)
+    token = metrics.request_timings.set(timings)
+    try:
+        return await _run_summarization(text, options, on_summary, checkpoint, wait_for_queue)
+    except Exception as e:
+        metrics.ERRORS.inc(error=type(e).__name__)
+        raise
+    finally:
+        metrics.request_timings.reset(token)
+
+
+# Постановка чанков в очередь модели с повтором, пока в очереди нет места
+async def submit_waiting(chunks, on_result=None, options=None):
+    while True:
+        try:
+            return await scheduler.submit(chunks, on_result, options=options)
+        except QueueFullError:
+            await asyncio.sleep(BATCH_RETRY_SECONDS)
+
+
+# Генерация через кэш чанков и очередь модели с заданными параметрами
+def cached_generate(generation, wait_for_queue):
+    # (с wait_for_queue уровень ждет места в очереди, а не завершается QueueFullError)
+    submit = submit_waiting if wait_for_queue else scheduler.submit
+    return cache.cached(functools.partial(submit, options=generation), generation_params(generation))
+
+
+# Генерация с бюджетом времени: параметры каждого уровня выбираются по оценке его времени
+# (среднее время чанка из BATCH_SECONDS), чтобы уровень укладывался в остаток бюджета
+def budgeted_generate(generation, latency_budget, wait_for_queue):
+    started = time.perf_counter()
+    model_beams = getattr(getattr(summarizer, "generation_config", None), "num_beams", None) or 1
+
+    async def generate(chunks, on_result=None):
+        remaining = latency_budget - (time.perf_counter() - started)
+        level = budget_generation_options(generation, len(chunks), metrics.seconds_per_chunk(),
+                                          remaining, model_beams)
+        if level["num_beams"] != generation["num_beams"]:
+            metrics.BUDGET_FALLBACKS.inc(action="greedy")
+        if level["target_length"] != generation["target_length"]:
+            metrics.BUDGET_FALLBACKS.inc(action="shorter")
+        return await cached_generate(level, wait_for_queue)(chunks, on_result)
+
+    return generate
+
+
+async def _run_summarization(text, options, on_summary, checkpoint, wait_for_queue):
+    # Пустой текст отклоняем до кэша: у него не может быть готовой суммаризации
+    require_text(text)
+    generation = generation_options(options.profile, options.target_length,
+                                    options.target_ratio, options.num_beams, options.greedy)
+    params = generation_params(generation)            # Параметры генерации для ключей кэша
+
+    # Документ уже суммаризировался с теми же параметрами (и тем же бюджетом отбора);
+    # бюджет времени в ключ не входит - готовый результат быстрее любого бюджета
+    started = time.perf_counter()
+    key = document_key(text, document_params(params, extract_tokens=options.extract_tokens,
+                                             extract_ratio=options.extract_ratio))
+    cached = await cache.get_async(key)
+    metrics.record_stage("cache_lookup", time.perf_counter() - started)
+    if cached is not None:
+        return cached, []
+
+    # Дерево map-reduce: чанки и окна каждого уровня идут в планировщик вместе,
+    # уже известные кэшу чанки в модель не отправляются
+    if options.latency_budget is None:
+        generate = cached_generate(generation, wait_for_queue)
+    else:
+        generate = budgeted_generate(generation, options.latency_budget, wait_for_queue)
+    # Асинхронная задача сохраняет готовые чанки, чтобы продолжить после перезапуска
+    if checkpoint is not None:
+        generate = checkpoint(generate)
+    summary, levels = await summarize_tree(text, tokenizer, generate, on_summary=on_summary,
+                                           extract_tokens=options.extract_tokens,
+                                           extract_ratio=options.extract_ratio,
+                                           latency_budget=options.latency_budget)
+
+    metrics.DOCUMENT_CHUNKS.observe(levels[0]["inputs"])
+    metrics.INPUT_TOKENS.inc(levels[0]["input_tokens"])
+    metrics.OUTPUT_TOKENS.inc(sum(level["output_tokens"] for level in levels))
+    metrics.REDUCE_DEPTH.observe(len(levels) - 1)
+
+    # Результат, сокращенный бюджетом времени, не кэшируем - без бюджета он был бы полнее
+    if options.latency_budget is None:
+        await cache.put_async(key, summary)
+    return summary, levels
 
 
 # Основной endpoint для суммаризации текста
 @app.post("/summarize")
 async def summarize(request: TextRequest):
+    require_ready()
+    started = time.perf_counter()
+    timings = {} if request.include_timings else None
     try:
-        text = request.text                           # Получаем текст из запроса
-
-        # Токенизируем текст для проверки длины
-        inputs = tokenizer(text, return_tensors="pt", truncation=False)
-        input_length = inputs['input_ids'].shape[1]   # Получаем длину в токенах
-
-        # Если текст короткий - обрабатываем сразу
-        if input_length <= MAX_MODEL_LENGTH:
-            summary = summarizer(
-                text,
-                max_length=SUMMARY_LENGTH,      # Макс длина суммаризации
-                min_length=MIN_SUMMARY_LENGTH,  # Мин длина суммаризации
-                do_sample=False                 # Не использовать случайную генерацию
-            )[0]['summary_text']
-            return {"summary": summary}
-
-        # Для длинных текстов - разбиваем на чанки
-        chunks = split_text(text, tokenizer)
-        if not chunks:
-            return {"error": "Не удалось разбить текст на части"}
-
-        # Суммаризируем каждый чанк отдельно
-        summaries = []
-        for chunk in chunks:
-            chunk_summary = summarizer(
-                chunk,
-                max_length=SUMMARY_LENGTH,
-                min_length=MIN_SUMMARY_LENGTH,
-                do_sample=False
-            )
-            summaries.append(chunk_summary[0]['summary_text'])
-
-        # Объединяем результаты суммаризации чанков
-        combined_summary = ' '.join(summaries)
-
-        # Если объединенная суммаризация слишком длинная - рекурсивно сокращаем
-        if len(tokenizer.tokenize(combined_summary)) > MAX_MODEL_LENGTH:
-            return await summarize(TextRequest(text=combined_summary))
-
-        return {"summary": combined_summary}
+        summary, levels = await run_summarization(request.text, request, timings=timings)
+    except QueueFullError as e:
+        # Очередь модели переполнена - просим клиента повторить запрос позже
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
+        # Текст нельзя суммаризировать (например, не удалось разбить на части)
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        # Обработка любых ошибок в процессе суммаризации
-        return {"error": str(e)}
\ No newline at end of file
+        # Ошибка модели - код 500, чтобы она была видна в статистике ответов
+        logger.error(f"Summarization failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    response = {"summary": summary, "levels": levels}
+    if timings is not None:
+        timings["total"] = round(time.perf_counter() - started, 4)
+        response["timings"] = timings
+    return response
+
+
+# Пакетная суммаризация: чанки всех документов проходят через общую очередь модели
+@app.post("/summarize/batch")
+async def summarize_batch(request: BatchRequest):
+    require_ready()
+    if len(request.texts) > MAX_BATCH_DOCUMENTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Слишком много документов: {len(request.texts)} > {MAX_BATCH_DOCUMENTS}"
+        )
+
+    # Ограничиваем число документов в обработке, чтобы не переполнить очередь модели;
+    # если очередь все же занята (например, интерактивными запросами), документ ждет
+    # места в ней, а не получает ошибку
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def summarize_one(text):
+        async with semaphore:
+            try:
+                summary, levels = await run_summarization(text, request, wait_for_queue=True)
+                return {"summary": summary, "levels": levels}
+            except Exception as e:
+                return {"error": str(e)}
+
+    results = await asyncio.gather(*(summarize_one(text) for text in request.texts))
+    return {"results": results}
+
+
+# Потоковая суммаризация: события в формате NDJSON (одна JSON-строка на событие)
+#   {"type": "chunk", "level": 0, "index": 3, "summary": "..."} - готов чанк или окно уровня
+#   {"type": "summary", "summary": "...", "levels": [...]}       - итоговая суммаризация
+#   {"type": "error", "error": "..."}                            - ошибка
+@app.post("/summarize/stream")
+async def summarize_stream(request: TextRequest):
+    require_ready()
+    events = asyncio.Queue()
+
+    def on_summary(level, index, summary):
+        events.put_nowait({"type": "chunk", "level": level, "index": index, "summary": summary})
+
+    async def produce():
+        try:
+            summary, levels = await run_summarization(request.text, request, on_summary)
+            events.put_nowait({"type": "summary", "summary": summary, "levels": levels})
+        except Exception as e:
+            events.put_nowait({"type": "error", "error": str(e)})
+
+    async def stream():
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                event = await events.get()
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+                if event["type"] != "chunk":
+                    break
+        finally:
+            # Клиент отключился - отменяем суммаризацию, ее чанки не попадут в модель
+            task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# Выполнение асинхронной задачи фоновым обработчиком
+async def run_job(request, checkpoint):
+    job = JobRequest(**request)
+    return await run_summarization(job.text, job, checkpoint=checkpoint)
+
+
+# Асинхронная суммаризация: ID задачи возвращается сразу, результат - через GET /jobs/{job_id}
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    require_ready()
+    require_jobs()
+    try:
+        require_text(request.text)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # Обращения к базе задач - в отдельном потоке (ожидание блокировки не держит event loop)
+    if await asyncio.to_thread(jobs.count, "queued") >= MAX_QUEUED_JOBS:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Слишком много задач в очереди (>= {MAX_QUEUED_JOBS})",
+            headers={"Retry-After": "30"}
+        )
+    job_id = await asyncio.to_thread(jobs.create, jsonable_encoder(request))
+    job_runner.notify()
+    return {"id": job_id, "status": "queued"}
+
+
+# Статус, прогресс и результат задачи (доступны и пока модель загружается)
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    require_jobs()
+    job = await asyncio.to_thread(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return job
@@ -0,0 +1,279 @@
+"""
+Файл metrics.py — Метрики сервиса в формате Prometheus:
+1) Счетчики, гистограммы и gauge-метрики с метками
+2) Время этапов пайплайна (разбиение, map, reduce, ожидание в очереди)
+3) Разбивка времени по этапам для отдельного запроса (contextvar)
+4) Текстовый формат экспозиции для endpoint /metrics
+5) Объединение метрик процессов app.serve через снимки в METRICS_DIR
+
+Задержка HTTP (summarizer_request_seconds) измеряется до отправки
+последнего байта тела ответа, поэтому для /summarize/stream она включает
+всю потоковую суммаризацию, а не только отправку заголовков.
+
+Несколько процессов app.serve принимают соединения на одном порту, поэтому
+/metrics отвечает случайный процесс. Чтобы Prometheus видел одни и те же
+монотонные ряды, каждый процесс раз в METRICS_FLUSH_SECONDS записывает снимок
+своих метрик в METRICS_DIR, а /metrics отдает сумму снимков всех процессов.
+Снимки завершившихся процессов остаются в сумме счетчиков и гистограмм
+(иначе перезапуск процесса выглядел бы как сброс счетчика), а в gauge-метриках
+учитываются только живые процессы.
+
+"""
+
+# Импорт необходимых библиотек
+import glob                                       # Снимки метрик процессов
+import json                                       # Формат снимков
+import os                                         # Каталог снимков и ID процесса
+import threading                                  # Блокировка: метрики пишут разные потоки
+from contextvars import ContextVar                # Разбивка времени текущего запроса
+
+# Границы корзин гистограмм по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Каталог снимков метрик процессов app.serve (None - один процесс, снимки не нужны)
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 1))  # Период записи снимка
+
+# Все созданные метрики в порядке объявления
+_registry = []
+
+# Словарь этапов текущего запроса (None - разбивка не нужна)
+request_timings = ContextVar("request_timings", default=None)
+
+
+def _escape(value):
+    """Экранирует значение метки (обратная косая черта, кавычки, перевод строки)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    """Форматирует метки: {name="value",...}."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class _Metric:
+    """Базовый класс метрики: имя, описание, имена меток и значения по меткам."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def render(self, values=None):
+        """Строки метрики; values - значения по меткам (None - значения этого процесса)."""
+        if values is None:
+            with self._lock:
+                values = {key: self._dump(value) for key, value in self._values.items()}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(values.items()):
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def snapshot(self):
+        """Значения в виде, пригодном для JSON: [[метки, значение], ...]."""
+        with self._lock:
+            return [[list(key), self._dump(value)] for key, value in self._values.items()]
+
+    def _dump(self, value):
+        """Копия значения (снимок сериализуется вне блокировки)."""
+        return value
+
+    def _load(self, value):
+        """Значение из снимка."""
+        return value
+
+    def _combine(self, first, second):
+        """Сумма значений одного ряда из разных процессов."""
+        return first + second
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(key)} {value}"]
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Текущее значение (например, глубина очереди)."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам, сумма и количество наблюдений."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def _render_value(self, key, value):
+        counts, total, count = value
+        lines = [
+            f"{self.name}_bucket{_format_labels(key + (('le', bound),))} {bucket_count}"
+            for bound, bucket_count in zip(self.buckets, counts)
+        ]
+        lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def total(self):
+        """Сумма наблюдений по всем меткам."""
+        with self._lock:
+            return sum(total for _, total, _ in self._values.values())
+
+    def _dump(self, value):
+        counts, total, count = value
+        return [list(counts), total, count]
+
+    def _load(self, value):
+        counts, total, count = value
+        return list(counts), total, count
+
+    def _combine(self, first, second):
+        return ([a + b for a, b in zip(first[0], second[0])],
+                first[1] + second[1], first[2] + second[2])
+
+
+def render():
+    """
+    Все метрики в текстовом формате Prometheus.
+
+    С METRICS_DIR - сумма снимков всех процессов (снимок этого процесса
+    обновляется перед чтением); без него - метрики этого процесса.
+
+    """
+    if METRICS_DIR is None:
+        lines = []
+        for metric in _registry:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    write_snapshot()
+    merged = {metric.name: {} for metric in _registry}
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        alive = _process_alive(snapshot["pid"])
+        for metric in _registry:
+            # Текущее значение gauge есть только у живого процесса
+            if metric.kind == "gauge" and not alive:
+                continue
+            values = merged[metric.name]
+            for key, value in snapshot["metrics"].get(metric.name, []):
+                key = tuple(tuple(label) for label in key)
+                value = metric._load(value)
+                values[key] = metric._combine(values[key], value) if key in values else value
+
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render(merged[metric.name]))
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot():
+    """Записывает снимок метрик этого процесса в METRICS_DIR (атомарно)."""
+    if METRICS_DIR is None:
+        return
+    snapshot = {
+        "pid": os.getpid(),
+        "metrics": {metric.name: metric.snapshot() for metric in _registry},
+    }
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def _process_alive(pid):
+    """Проверяет, что процесс с данным PID существует."""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Метрики HTTP-запросов
+REQUESTS = Counter("summarizer_requests_total", "HTTP requests", ["endpoint", "status"])
+REQUEST_SECONDS = Histogram("summarizer_request_seconds", "HTTP request latency until the last body byte",
+                            ["endpoint"])
+ERRORS = Counter("summarizer_errors_total", "Failed summarizations", ["error"])
+
+# Метрики пайплайна
+STAGE_SECONDS = Histogram("summarizer_stage_seconds", "Time per pipeline stage", ["stage"])
+DOCUMENT_CHUNKS = Histogram("summarizer_document_chunks", "Chunks per document",
+                            buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024))
+INPUT_TOKENS = Counter("summarizer_input_tokens_total", "Document tokens sent to the model")
+OUTPUT_TOKENS = Counter("summarizer_output_tokens_total", "Summary tokens generated by the model")
+REDUCE_DEPTH = Histogram("summarizer_reduce_depth", "Reduction levels per document",
+                         buckets=(0, 1, 2, 3, 4, 5, 8))
+
+# Метрики очереди модели
+QUEUE_WAIT_SECONDS = Histogram("summarizer_queue_wait_seconds", "Chunk wait time in the model queue")
+BATCH_SIZE = Histogram("summarizer_batch_size", "Chunks per model batch",
+                       buckets=(1, 2, 4, 8, 16, 32, 64))
+BATCH_SECONDS = Histogram("summarizer_batch_seconds", "Model time per batch")
+QUEUE_DEPTH = Gauge("summarizer_queue_depth", "Chunks waiting in the model queue")
+BUDGET_FALLBACKS = Counter("summarizer_budget_fallbacks_total",
+                           "Tree levels decoded cheaper to fit latency_budget", ["action"])
+
+# Метрики кэша (объем обновляется при каждом запросе /metrics)
+CACHE_LOOKUPS = Counter("summarizer_cache_lookups_total", "Summary cache lookups", ["result"])
+CACHE_BYTES = Gauge("summarizer_cache_bytes", "Summary cache size in memory")
+
+
+def seconds_per_chunk():
+    """Среднее время модели на чанк по батчам этого процесса (None - батчей еще не было)."""
+    chunks = BATCH_SIZE.total()
+    return BATCH_SECONDS.total() / chunks if chunks else None
+
+
+def record_stage(stage, seconds):
+    """Учитывает время этапа в гистограмме и в разбивке текущего запроса."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = request_timings.get()
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0) + seconds, 4)
@@ -7,88 +7,500 @@
 """
 
 # Импорт необходимых библиотек
-from transformers import pipeline, BartTokenizer  # Для работы с моделями NLP
+import asyncio                                    # Для асинхронного дерева суммаризации
+import math                                       # Округление длины суммаризации
 import re                                         # Для работы с регулярными выражениями
-import torch                                       # Для определения устройства (GPU/CPU)
+import os                                         # Для чтения настроек из переменных окружения
+import time                                       # Для замера времени уровней суммаризации
+import zlib                                       # Хэш предложений для границ частей по содержимому
+from array import array                           # Байтовое представление ID токенов для хэша
+from app.backends import INFERENCE_BACKEND, load_model  # Бэкенды инференса модели
+from app.cache import document_key                # Ключи кэша суммаризаций
+from app.metrics import record_stage              # Время этапов пайплайна
 
 # Константы для настройки модели
+MODEL_NAME = os.getenv("MODEL_NAME", "facebook/bart-large-cnn")  # ID модели (или путь к снимку)
 MAX_MODEL_LENGTH = 1024  # Максимальная длина входного текста в токенах
 SUMMARY_LENGTH = 150     # Желаемая длина суммаризированного текста
 MIN_SUMMARY_LENGTH = 30  # Минимальная длина суммаризированного текста
-OVERLAP_SIZE = 50        # Размер перекрытия между частями текста при разбиении
+OVERLAP_SIZE = 50        # Размер перекрытия между частями текста в токенах
+# Границы частей по содержимому: часть заканчивается на предложении, хэш которого
+# делится на 2^CHUNK_BOUNDARY_BITS, но не раньше заполнения CHUNK_MIN_FILL бюджета
+CHUNK_MIN_FILL = float(os.getenv("CHUNK_MIN_FILL", 0.6))
+CHUNK_BOUNDARY_BITS = int(os.getenv("CHUNK_BOUNDARY_BITS", 3))
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", 8))  # Количество частей текста в одном вызове модели
+MAX_REDUCE_DEPTH = int(os.getenv("MAX_REDUCE_DEPTH", 3))  # Максимум уровней сокращения суммаризаций
+# Длины входов (в токенах) для прогрева модели при запуске; пустая строка - без прогрева
+WARMUP_LENGTHS = [int(length) for length in os.getenv("WARMUP_LENGTHS", "64,512,1024").split(",")
+                  if length.strip()]
+REDUCE_TARGET_LENGTH = int(os.getenv("REDUCE_TARGET_LENGTH", MAX_MODEL_LENGTH))  # Целевая длина, токены
+SUMMARY_RATIO = float(os.getenv("SUMMARY_RATIO", 0.5))  # Максимальная длина суммаризации от длины части
+LENGTH_STEP = 16         # Шаг округления max_length: части близкой длины генерируются одним батчем
+BUDGET_MIN_LENGTH = 32   # Минимальная target_length при сокращении по бюджету времени
 
+# Профили генерации: значения по умолчанию для параметров запроса
+GENERATION_PROFILES = {
+    "default": {},                   # Beam search из конфигурации модели
+    "fast": {"num_beams": 1},        # Жадное декодирование: каждая строка батча завершается на </s>
+}
 
-def load_summarizer():
+# Граница предложения: пробельный символ после . ? ! (кроме сокращений вида "e.g." и "Mr.")
+SENTENCE_BOUNDARY = re.compile(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s')
+
+
+def generation_options(profile="default", target_length=None, target_ratio=None,
+                       num_beams=None, greedy=False):
+    """
+    Собирает параметры генерации запроса: профиль и явно заданные значения.
+
+    Аргументы:
+        1) profile (str): Профиль из GENERATION_PROFILES
+        2) target_length (int): Максимальная длина суммаризации части в токенах
+           (None - SUMMARY_LENGTH)
+        3) target_ratio (float): Максимальная длина суммаризации от длины части
+           (None - SUMMARY_RATIO)
+        4) num_beams (int): Количество лучей beam search (None - из профиля или модели)
+        5) greedy (bool): Жадное декодирование (num_beams=1)
+
+    Возвращает:
+        dict: target_length, target_ratio и num_beams
+
+    Исключения:
+        ValueError: Если профиль неизвестен
+
+    """
+    if profile not in GENERATION_PROFILES:
+        raise ValueError(
+            f"Неизвестный профиль {profile!r}, доступны: {', '.join(GENERATION_PROFILES)}"
+        )
+
+    options = {"target_length": SUMMARY_LENGTH, "target_ratio": SUMMARY_RATIO, "num_beams": None}
+    options.update(GENERATION_PROFILES[profile])
+    if target_length is not None:
+        options["target_length"] = target_length
+    if target_ratio is not None:
+        options["target_ratio"] = target_ratio
+    if num_beams is not None:
+        options["num_beams"] = num_beams
+    if greedy:
+        options["num_beams"] = 1
+    return options
+
+
+def chunk_generation_kwargs(length, options):
+    """
+    Параметры generate для части длиной length токенов.
+
+    max_length пропорциональна длине части (не больше target_length) и
+    округляется вверх до LENGTH_STEP, min_length - не больше половины max_length.
+    Короткие части не генерируют (и не перебирают лучами) до SUMMARY_LENGTH токенов.
+
+    """
+    limit = math.ceil(length * options["target_ratio"] / LENGTH_STEP) * LENGTH_STEP
+    max_length = max(1, min(options["target_length"], limit))
+    kwargs = {
+        "max_length": max_length,
+        "min_length": min(MIN_SUMMARY_LENGTH, max_length // 2),
+        "do_sample": False,
+    }
+    if options["num_beams"] is not None:
+        kwargs["num_beams"] = options["num_beams"]
+    return kwargs
+
+
+def budget_generation_options(options, chunks, seconds_per_chunk, remaining, model_beams=1):
+    """
+    Параметры генерации уровня дерева, укладывающиеся в оставшийся бюджет времени.
+
+    Время уровня оценивается как chunks × seconds_per_chunk. Если оценка
+    больше remaining, декодирование становится жадным (время beam search
+    примерно пропорционально числу лучей); если и этого мало, target_length
+    уменьшается пропорционально нехватке времени (не меньше BUDGET_MIN_LENGTH).
+
+    Аргументы:
+        1) options (dict): Параметры генерации из generation_options
+        2) chunks (int): Количество чанков уровня
+        3) seconds_per_chunk (float): Среднее время модели на чанк (None - оценки еще нет)
+        4) remaining (float): Оставшийся бюджет времени в секундах
+        5) model_beams (int): Количество лучей модели по умолчанию (для num_beams=None)
+
+    Возвращает:
+        dict: Параметры генерации уровня (options, если бюджета хватает)
+
+    """
+    if seconds_per_chunk is None:
+        return options
+    estimate = chunks * seconds_per_chunk
+    if estimate <= remaining:
+        return options
+
+    options = dict(options)
+    beams = options["num_beams"] or model_beams
+    if beams > 1:
+        options["num_beams"] = 1
+        estimate /= beams
+    if estimate > remaining:
+        length = int(options["target_length"] * max(remaining, 0) / estimate)
+        options["target_length"] = min(options["target_length"],
+                                       max(BUDGET_MIN_LENGTH, length // LENGTH_STEP * LENGTH_STEP))
+    return options
+
+
+def generation_key(length, options=None):
+    """Ключ группы частей, которые можно выполнить одним вызовом generate."""
+    return tuple(sorted(chunk_generation_kwargs(length, options or generation_options()).items()))
+
+
+def generation_params(options=None):
+    """Параметры, от которых зависит результат суммаризации (входят в ключ кэша)."""
+    return {
+        "model": MODEL_NAME,
+        "backend": INFERENCE_BACKEND,
+        "min_length": MIN_SUMMARY_LENGTH,
+        **(options or generation_options()),
+    }
+
+
+def document_params(params, **options):
+    """Параметры ключа кэша документа: генерация и заданные параметры запроса (кроме None)."""
+    options = {name: value for name, value in options.items() if value is not None}
+    return {**params, **options} if options else params
+
+
+def load_summarizer(backend=INFERENCE_BACKEND):
     """
     Загружает модель для суммаризации и токенизатор.
 
+    Аргументы:
+        1) backend (str): Бэкенд инференса (torch, torch-int8 или onnx)
+
     Возвращает:
-        tuple: (summarizer, tokenizer) - пайплайн для суммаризации и токенизатор
+        tuple: (summarizer, tokenizer) - модель с методом generate и токенизатор
 
     Исключения:
         Exception: Если произошла ошибка при загрузке модели
 
     """
+    # torch и transformers импортируются только здесь - импорт модуля остается быстрым
+    from transformers import BartTokenizerFast
+
     try:
-        # Загрузка токенизатора для модели BART-large-CNN
-        tokenizer = BartTokenizer.from_pretrained('facebook/bart-large-cnn')
-
-        # Создание пайплайна для суммаризации
-        summarizer = pipeline(
-            "summarization",                         # Тип задачи
-            model="facebook/bart-large-cnn",              # Используемая модель
-            tokenizer=tokenizer,                          # Токенизатор
-            device=0 if torch.cuda.is_available() else -1  # Использование GPU если доступен
-        )
+        # Загрузка быстрого токенизатора (нужен offset mapping для разбиения текста)
+        tokenizer = BartTokenizerFast.from_pretrained(MODEL_NAME)
+
+        # Загрузка модели выбранным бэкендом (PyTorch FP32 использует GPU если доступен)
+        summarizer = load_model(MODEL_NAME, backend)
         return summarizer, tokenizer
     except Exception as e:
         raise Exception(f"Ошибка загрузки модели: {str(e)}")
 
 
-def split_text(text, tokenizer, max_length=MAX_MODEL_LENGTH, overlap=OVERLAP_SIZE):
+def split_text(text, tokenizer, max_length=MAX_MODEL_LENGTH, overlap=OVERLAP_SIZE,
+               min_fill=CHUNK_MIN_FILL, boundary_bits=CHUNK_BOUNDARY_BITS):
     """
     Разбивает текст на части, не превышающие максимальную длину.
 
+    Текст токенизируется один раз, границы предложений переводятся в
+    позиции токенов через offset mapping, а части собираются из отрезков
+    токенов. Перекрытие задается в токенах: в начало следующей части
+    переносятся последние целые предложения, суммарно не длиннее overlap.
+
+    Границы частей зависят от содержимого, а не от позиции в тексте: часть
+    заканчивается на первом предложении после min_fill бюджета, хэш токенов
+    которого делится на 2^boundary_bits (или там, где следующее предложение
+    не помещается). После правки в середине документа границы снова
+    совпадают с прежними через одну-две части, поэтому остальные части
+    берутся из кэша чанков. Текст, целиком помещающийся в часть, не делится.
+
     Аргументы:
         1) text (str): Текст для разбиения
-        2) tokenizer: Токенизатор для подсчета длины текста
-        3) max_length (int): Максимальная длина части текста
-        4) overlap (int): Размер перекрытия между частями текста
+        2) tokenizer: Быстрый токенизатор (с поддержкой offset mapping)
+        3) max_length (int): Максимальная длина части в токенах с учетом служебных
+        4) overlap (int): Размер перекрытия между частями в токенах
+        5) min_fill (float): Доля бюджета, до которой часть не заканчивается по содержимому
+        6) boundary_bits (int): Граница по содержимому - в среднем каждое 2^boundary_bits предложение
 
     Возвращает:
-        list: Список частей текста подходящей длины
+        list: Части текста в виде списков ID токенов (без служебных токенов)
 
     """
-    # Разбиваем текст на предложения с сохранением пунктуации
-    sentences = re.split(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s', text)
-    chunks = []               # Результирующие части текста
-    current_chunk = []        # Текущая формируемая часть
-    current_length = 0        # Текущая длина в токенах
+    encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    input_ids = encoding['input_ids']
+    offsets = encoding['offset_mapping']
+    # Место под служебные токены <s> и </s>
+    budget = max_length - tokenizer.num_special_tokens_to_add()
 
-    for sentence in sentences:
-        # Подсчет длины предложения в токенах
-        sentence_length = len(tokenizer.tokenize(sentence))
+    # Переводим границы предложений из символов в индексы токенов (один проход)
+    boundaries = []
+    position = 0
+    for match in SENTENCE_BOUNDARY.finditer(text):
+        while position < len(offsets) and offsets[position][0] < match.end():
+            position += 1
+        if 0 < position < len(input_ids) and (not boundaries or boundaries[-1] < position):
+            boundaries.append(position)
+    boundaries.append(len(input_ids))
 
-        # Если предложение помещается в текущую часть
-        if current_length + sentence_length <= max_length:
-            current_chunk.append(sentence)
-            current_length += sentence_length
+    # Отрезки предложений; слишком длинные предложения режем по budget токенов
+    spans = []
+    start = 0
+    for end in boundaries:
+        for piece_start in range(start, end, budget):
+            spans.append((piece_start, min(piece_start + budget, end)))
+        start = end
+
+    # Предложения, после которых может проходить граница части (зависит только от их токенов)
+    mask = (1 << boundary_bits) - 1
+    cuts = [zlib.crc32(array("l", input_ids[start:end]).tobytes()) & mask == 0
+            for start, end in spans]
+    min_tokens = int(budget * min_fill)
+
+    chunks = []       # Результирующие части текста
+    first = 0         # Индекс первого предложения текущей части
+    covered = 0       # Предложений в уже собранных частях (перекрытие - не новая граница)
+    while first < len(spans):
+        chunk_start = spans[first][0]
+        if spans[-1][1] - chunk_start <= budget:
+            # Остаток текста помещается в одну часть
+            last = len(spans)
         else:
-            if current_chunk:
-                # Добавляем готовую часть в результат
-                chunks.append(' '.join(current_chunk))
-                # Сохраняем перекрытие для контекста
-                current_chunk = current_chunk[-overlap:] if overlap > 0 else []
-                current_chunk.append(sentence)
-                current_length = sum(len(tokenizer.tokenize(s)) for s in current_chunk)
-
-    # Добавляем последнюю часть, если она не пустая
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
+            # Добавляем предложения, пока часть помещается в budget, и заканчиваем
+            # ее на первой границе по содержимому после min_tokens
+            last = first
+            while last < len(spans) and spans[last][1] - chunk_start <= budget:
+                last += 1
+                if (cuts[last - 1] and last > covered
+                        and spans[last - 1][1] - chunk_start >= min_tokens):
+                    break
+        chunks.append(input_ids[chunk_start:spans[last - 1][1]])
+        if last == len(spans):
+            break
+        covered = last
+
+        # Перекрытие: последние предложения части, суммарно не длиннее overlap
+        next_first = last
+        while next_first - 1 > first and spans[last - 1][1] - spans[next_first - 1][0] <= overlap:
+            next_first -= 1
+        # Следующее предложение вместе с перекрытием должно помещаться в часть
+        while spans[last][1] - spans[next_first][0] > budget:
+            next_first += 1
+        first = next_first
     return chunks
 
 
-def summarize_long_text(text, summarizer, tokenizer, max_model_length=MAX_MODEL_LENGTH):
+def summarize_chunks(chunks, summarizer, tokenizer, batch_size=BATCH_SIZE, options=None):
+    """
+    Суммаризирует части текста батчами.
+
+    Части сортируются по длине в токенах, чтобы в один батч попадали
+    близкие по длине тексты и на выравнивание (padding) уходило меньше
+    вычислений. Длина суммаризации зависит от длины части, поэтому батчи
+    собираются из частей с одинаковыми параметрами generate. ID токенов
+    передаются в модель напрямую, без повторной токенизации. Результаты
+    возвращаются в исходном порядке частей.
+
+    Аргументы:
+        1) chunks (list): Части текста - списки ID токенов из split_text
+        2) summarizer: Модель для суммаризации (из load_summarizer)
+        3) tokenizer: Токенизатор для служебных токенов и декодирования
+        4) batch_size (int): Максимальное количество частей в одном батче
+        5) options (dict): Параметры генерации из generation_options (None - по умолчанию)
+
+    Возвращает:
+        list: Суммаризации частей в том же порядке, что и chunks
+
+    """
+    import torch
+
+    options = options or generation_options()
+    # Порядок обработки от длинных частей к коротким, группы по параметрам generate
+    order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]), reverse=True)
+    groups = {}
+    for i in order:
+        groups.setdefault(generation_key(len(chunks[i]), options), []).append(i)
+
+    summaries = [None] * len(chunks)
+    batches = [
+        (dict(kwargs), indices[start:start + batch_size])
+        for kwargs, indices in groups.items()
+        for start in range(0, len(indices), batch_size)
+    ]
+    for kwargs, batch_indices in batches:
+        # Добавляем <s> и </s> и выравниваем батч по самой длинной части
+        inputs = tokenizer.pad(
+            {"input_ids": [tokenizer.build_inputs_with_special_tokens(chunks[i])
+                           for i in batch_indices]},
+            return_tensors="pt"
+        ).to(summarizer.device)
+        # Один вызов модели на весь батч
+        with torch.no_grad():
+            output_ids = summarizer.generate(**inputs, **kwargs)
+        results = tokenizer.batch_decode(
+            output_ids, skip_special_tokens=True, clean_up_tokenization_spaces=False
+        )
+        # Раскладываем результаты по исходным позициям
+        for i, result in zip(batch_indices, results):
+            summaries[i] = result
+    return summaries
+
+
+def warm_up(summarizer, tokenizer, lengths=WARMUP_LENGTHS):
+    """
+    Прогревает модель генерацией на входах разной длины.
+
+    Первый вызов generate для каждой формы входа заметно медленнее
+    последующих, поэтому его стоимость оплачивается при запуске,
+    а не первым запросом пользователя.
+
+    Аргументы:
+        1) summarizer: Модель для суммаризации (из load_summarizer)
+        2) tokenizer: Токенизатор
+        3) lengths (list): Длины входов в токенах (с учетом служебных)
+
+    Возвращает:
+        dict: Время прогрева в секундах для каждой длины
+
+    """
+    filler = tokenizer(" the", add_special_tokens=False)['input_ids']
+    budget = MAX_MODEL_LENGTH - tokenizer.num_special_tokens_to_add()
+    timings = {}
+    for length in lengths:
+        chunk_length = max(1, min(length - tokenizer.num_special_tokens_to_add(), budget))
+        started = time.perf_counter()
+        summarize_chunks([(filler * chunk_length)[:chunk_length]], summarizer, tokenizer)
+        timings[length] = round(time.perf_counter() - started, 3)
+    return timings
+
+
+def group_windows(token_lists, budget):
+    """
+    Объединяет последовательные суммаризации в окна, помещающиеся в модель.
+
+    Аргументы:
+        1) token_lists (list): Суммаризации в виде списков ID токенов
+        2) budget (int): Максимальная длина окна в токенах
+
+    Возвращает:
+        list: Окна - списки ID токенов
+
+    """
+    windows = []
+    current = []
+    for input_ids in token_lists:
+        input_ids = input_ids[:budget]
+        if current and len(current) + len(input_ids) > budget:
+            windows.append(current)
+            current = []
+        current.extend(input_ids)
+    if current:
+        windows.append(current)
+    return windows
+
+
+def require_text(text):
+    """Проверяет, что текст не пустой (не только пробелы); иначе ValueError."""
+    if not text.strip():
+        raise ValueError("Пустой текст: нечего суммаризировать")
+
+
+async def summarize_tree(text, tokenizer, generate, max_length=MAX_MODEL_LENGTH,
+                         max_depth=MAX_REDUCE_DEPTH, target_length=REDUCE_TARGET_LENGTH,
+                         on_summary=None, extract_tokens=None, extract_ratio=None,
+                         latency_budget=None):
+    """
+    Суммаризирует текст деревом map-reduce с ограниченной глубиной.
+
+    Если задан бюджет extract_tokens или extract_ratio, длинный текст
+    сначала сокращается экстрактивно (самые центральные предложения,
+    см. app/extractive.py), и в модель идет только сокращенный текст.
+
+    Уровень 0 суммаризирует части текста (map). Пока объединенные
+    суммаризации длиннее target_length, они группируются в окна,
+    помещающиеся в модель, и все окна уровня сокращаются одним вызовом
+    generate (reduce). После max_depth уровней сокращения возвращается
+    объединение последнего уровня, даже если оно длиннее target_length.
+    С latency_budget следующий уровень не начинается, если по времени
+    предыдущего уровня он не успеет завершиться в пределах бюджета (само
+    декодирование под бюджет подстраивает generate, см.
+    budget_generation_options).
+
+    Аргументы:
+        1) text (str): Текст для суммаризации
+        2) tokenizer: Быстрый токенизатор
+        3) generate: Асинхронная функция (chunks, on_result=None) -> list[str];
+           on_result(index, summary) вызывается по готовности каждого чанка
+        4) max_length (int): Максимальная длина входа модели в токенах
+        5) max_depth (int): Максимальное количество уровней сокращения
+        6) target_length (int): Длина результата в токенах, при которой сокращение останавливается
+        7) on_summary: Функция (level, index, summary), вызываемая для каждой
+           готовой суммаризации чанка или окна (None - не вызывать)
+        8) extract_tokens (int): Бюджет экстрактивного отбора в токенах (None - без ограничения)
+        9) extract_ratio (float): Доля токенов текста после отбора (None - без ограничения)
+        10) latency_budget (float): Бюджет времени на дерево в секундах (None - без ограничения)
+
+    Возвращает:
+        tuple: (summary, levels) - суммаризация и статистика по уровням
+            (количество входов, входные и выходные токены, время в секундах)
+
+    Исключения:
+        ValueError: Если текст не удалось разбить на части
+
+    """
+    tree_started = time.perf_counter()
+    # Экстрактивный отбор предложений (NumPy импортируется только при использовании)
+    if extract_tokens is not None or extract_ratio is not None:
+        from app.extractive import condense
+
+        started = time.perf_counter()
+        text = await asyncio.to_thread(condense, text, tokenizer, extract_tokens, extract_ratio)
+        record_stage("extract", time.perf_counter() - started)
+
+    # Разбиение длинного текста выполняем вне event loop
+    started = time.perf_counter()
+    chunks = await asyncio.to_thread(split_text, text, tokenizer, max_length)
+    record_stage("split", time.perf_counter() - started)
+    if not chunks:
+        raise ValueError("Не удалось разбить текст на части")
+    budget = max_length - tokenizer.num_special_tokens_to_add()
+
+    levels = []
+    depth = 0
+    while True:
+        started = time.perf_counter()
+        # Все части уровня отправляются в модель вместе и обрабатываются батчами
+        on_result = None
+        if on_summary is not None:
+            def on_result(index, summary, level=depth):
+                on_summary(level, index, summary)
+        summaries = await generate(chunks, on_result)
+        # Токены суммаризаций (с пробелом-разделителем) для подсчета и окон следующего уровня
+        summary_ids = tokenizer([' ' + summary for summary in summaries],
+                                add_special_tokens=False)['input_ids']
+        output_tokens = sum(len(input_ids) for input_ids in summary_ids)
+        seconds = time.perf_counter() - started
+        # Уровень 0 - суммаризация частей текста (map), остальные - сокращение (reduce)
+        record_stage("map" if depth == 0 else "reduce", seconds)
+        levels.append({
+            "level": depth,
+            "inputs": len(chunks),
+            "input_tokens": sum(len(chunk) for chunk in chunks),
+            "output_tokens": output_tokens,
+            "seconds": round(seconds, 3),
+        })
+
+        # Готово: одна суммаризация, достигнута целевая длина или предел глубины
+        if len(summaries) == 1 or output_tokens <= target_length or depth >= max_depth:
+            return ' '.join(summaries), levels
+        # Следующий уровень короче текущего, но его время оцениваем по текущему
+        if (latency_budget is not None
+                and time.perf_counter() - tree_started + seconds > latency_budget):
+            return ' '.join(summaries), levels
+
+        chunks = group_windows(summary_ids, budget)
+        depth += 1
+
+
+def summarize_long_text(text, summarizer, tokenizer, max_model_length=MAX_MODEL_LENGTH,
+                        cache=None, extract_tokens=None, extract_ratio=None, options=None):
     """
     Генерирует суммаризацию текста, при необходимости разбивая его на части.
 
@@ -97,46 +509,45 @@ def summarize_long_text(text, summarizer, tokenizer, max_model_length=MAX_MODEL_
         2) summarizer: Модель для суммаризации
         3) tokenizer: Токенизатор
         4) max_model_length (int): Максимальная длина обрабатываемого текста
+        5) cache (SummaryCache): Кэш суммаризаций документов и частей (None - без кэша)
+        6) extract_tokens (int): Бюджет экстрактивного отбора в токенах (None - без отбора)
+        7) extract_ratio (float): Доля токенов текста после отбора (None - без отбора)
+        8) options (dict): Параметры генерации из generation_options (None - по умолчанию)
 
     Возвращает:
-        str: Суммаризированный текст или сообщение об ошибке
+        str: Суммаризированный текст
+
+    Исключения:
+        ValueError: Если текст пустой или его не удалось разбить на части
 
     """
-    # Проверяем длину текста в токенах
-    inputs = tokenizer(text, return_tensors="pt", truncation=False)
-    input_length = inputs['input_ids'].shape[1]
+    require_text(text)
+    params = generation_params(options)
 
-    # Если текст короткий - обрабатываем целиком
-    if input_length <= max_model_length:
-        result = summarizer(
-            text,
-            max_length=SUMMARY_LENGTH,
-            min_length=MIN_SUMMARY_LENGTH,
-            do_sample=False                 # Детерминированная генерация
-        )
-        return result[0]['summary_text']
+    # Документ уже суммаризировался с теми же параметрами
+    if cache is not None:
+        key = document_key(text, document_params(params, extract_tokens=extract_tokens,
+                                                       extract_ratio=extract_ratio))
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
-    # Разбиваем длинный текст на части
-    chunks = split_text(text, tokenizer)
-    if not chunks:
-        return "Не удалось разбить текст на части"
-
-    # Суммаризируем каждую часть отдельно
-    summaries = []
-    for chunk in chunks:
-        chunk_summary = summarizer(
-            chunk,
-            max_length=SUMMARY_LENGTH,
-            min_length=MIN_SUMMARY_LENGTH,
-            do_sample=False
-        )
-        summaries.append(chunk_summary[0]['summary_text'])
+    async def generate(chunks, on_result=None):
+        summaries = summarize_chunks(chunks, summarizer, tokenizer, options=options)
+        if on_result is not None:
+            for index, summary in enumerate(summaries):
+                on_result(index, summary)
+        return summaries
 
-    # Объединяем результаты
-    combined_summary = ' '.join(summaries)
+    # Части, уже известные кэшу, в модель не отправляются
+    if cache is not None:
+        generate = cache.cached(generate, params)
 
-    # Если объединенная суммаризация слишком длинная - рекурсивно сокращаем
-    if len(tokenizer.tokenize(combined_summary)) > max_model_length:
-        return summarize_long_text(combined_summary, summarizer, tokenizer)
+    summary, _ = asyncio.run(
+        summarize_tree(text, tokenizer, generate, max_length=max_model_length,
+                       extract_tokens=extract_tokens, extract_ratio=extract_ratio)
+    )
 
-    return combined_summary
\ No newline at end of file
+    if cache is not None:
+        cache.put(key, summary)
+    return summary
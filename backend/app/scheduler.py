@@ -0,0 +1,253 @@
+"""
+Файл scheduler.py — Планировщик инференса:
+1) Принимает чанки из разных HTTP-запросов в общую ограниченную очередь
+2) Собирает их в батчи по максимальному размеру или времени ожидания
+   (чанки с разными параметрами генерации идут в модель разными вызовами)
+3) Выполняет генерацию в отдельном потоке, не блокируя event loop
+4) Сообщает о переполнении очереди и ведет статистику работы
+
+"""
+
+# Импорт необходимых библиотек
+import asyncio                                    # Очередь, futures и фоновая задача
+import logging                                    # Логирование работы планировщика
+import os                                         # Для чтения настроек из переменных окружения
+import time                                       # Время ожидания в очереди и длительность батчей
+from concurrent.futures import ThreadPoolExecutor  # Отдельный поток для вызовов модели
+from app.metrics import (                         # Метрики очереди и батчей
+    BATCH_SECONDS, BATCH_SIZE, QUEUE_WAIT_SECONDS, request_timings
+)
+
+logger = logging.getLogger(__name__)
+
+# Настройки планировщика
+MAX_BATCH_SIZE = int(os.getenv("SCHEDULER_MAX_BATCH_SIZE", 16))     # Максимальный размер батча
+MAX_WAIT_MS = float(os.getenv("SCHEDULER_MAX_WAIT_MS", 20))         # Ожидание добора батча, мс
+MAX_QUEUE_SIZE = int(os.getenv("SCHEDULER_MAX_QUEUE_SIZE", 512))    # Максимум чанков в очереди
+# Сколько чанков одного запроса может одновременно находиться в очереди (0 - четверть очереди)
+MAX_REQUEST_CHUNKS = int(os.getenv("SCHEDULER_MAX_REQUEST_CHUNKS", 0))
+
+
+class QueueFullError(Exception):
+    """Очередь планировщика заполнена, новые чанки не принимаются."""
+
+
+class InferenceScheduler:
+    """
+    Динамический батчинг запросов к модели.
+
+    Обработчики запросов кладут чанки в очередь и ждут futures, а фоновая
+    задача собирает чанки из разных запросов в один батч и выполняет
+    один вызов модели на весь батч.
+
+    Аргументы:
+        1) generate_fn: Синхронная функция (chunks, options) -> list[str],
+           где options - параметры генерации, общие для всех chunks
+        2) max_batch_size (int): Максимальное количество чанков в батче
+        3) max_wait_ms (float): Сколько ждать добора батча после первого чанка
+        4) max_queue_size (int): Максимальное количество чанков в очереди
+        5) max_request_chunks (int): Сколько чанков одного запроса одновременно
+           находится в очереди; остальные ставятся по мере обработки
+           (0 - четверть очереди, но не меньше батча)
+        6) batch_key: Функция (chunk, options) -> ключ; чанки с разными ключами
+           идут в generate_fn разными вызовами (None - группировка по options)
+
+    """
+
+    def __init__(self, generate_fn, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait_ms=MAX_WAIT_MS, max_queue_size=MAX_QUEUE_SIZE,
+                 max_request_chunks=MAX_REQUEST_CHUNKS, batch_key=None):
+        self.generate_fn = generate_fn
+        self.batch_key = batch_key or _options_key
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.max_request_chunks = min(
+            max_request_chunks or max(max_queue_size // 4, max_batch_size), max_queue_size
+        )
+        self.queue = None                 # Создается в start() внутри event loop
+        self._worker = None               # Фоновая задача сборки батчей
+        # Модель не потокобезопасна - все вызовы идут через один поток
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+        # Статистика работы
+        self.batches = 0                  # Количество выполненных батчей
+        self.items = 0                    # Количество обработанных чанков
+        self.rejected = 0                 # Количество отклоненных чанков
+        self.last_batch_size = 0          # Размер последнего батча
+
+    async def start(self):
+        """Создает очередь и запускает фоновую задачу."""
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            f"Scheduler started: max_batch_size={self.max_batch_size}, "
+            f"max_wait={self.max_wait * 1000:.0f}ms, max_queue_size={self.max_queue_size}"
+        )
+
+    async def stop(self):
+        """Останавливает фоновую задачу и поток модели."""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, chunks, on_result=None, options=None):
+        """
+        Ставит чанки в очередь и ждет их суммаризации.
+
+        Запрос до max_request_chunks чанков принимается целиком или не
+        принимается вовсе. Чанки большего запроса ставятся в очередь окном:
+        следующий чанк встает в очередь, когда готов один из предыдущих, поэтому
+        такой запрос не занимает всю очередь и выполняется при любом размере.
+        При отмене ожидания (например, при отключении клиента) еще не
+        обработанные чанки не попадут в модель.
+
+        Аргументы:
+            1) chunks (list): Чанки для суммаризации
+            2) on_result: Функция (index, summary), вызываемая по готовности
+               каждого чанка (None - не вызывать)
+            3) options (dict): Параметры генерации (None - по умолчанию)
+
+        Возвращает:
+            list: Суммаризации в порядке chunks
+
+        Исключения:
+            QueueFullError: Если в очереди нет места для чанков запроса
+                (для большого запроса - для первого окна)
+
+        """
+        window = min(len(chunks), self.max_request_chunks)
+        if self.queue.qsize() + window > self.max_queue_size:
+            self.rejected += len(chunks)
+            raise QueueFullError(
+                f"Очередь модели заполнена ({self.queue.qsize()}/{self.max_queue_size})"
+            )
+
+        loop = asyncio.get_running_loop()
+        # Разбивка времени запроса: ожидание в очереди записывает фоновая задача
+        timings = request_timings.get()
+        futures = []
+        for index in range(len(chunks)):
+            future = loop.create_future()
+            if on_result is not None:
+                future.add_done_callback(
+                    lambda done, index=index: _notify(done, index, on_result)
+                )
+            futures.append(future)
+
+        if len(chunks) <= window:
+            enqueued_at = time.perf_counter()
+            for chunk, future in zip(chunks, futures):
+                self.queue.put_nowait((chunk, future, enqueued_at, timings, options))
+            return await asyncio.gather(*futures)
+
+        feeder = asyncio.create_task(self._feed(chunks, futures, window, timings, options))
+        try:
+            return await asyncio.gather(*futures)
+        finally:
+            # Ошибка или отмена: оставшиеся чанки в очередь не ставим
+            feeder.cancel()
+            for future in futures:
+                future.cancel()
+
+    async def _feed(self, chunks, futures, window, timings, options):
+        """Ставит чанки большого запроса в очередь, держа в ней не больше window."""
+        slots = asyncio.Semaphore(window)
+        for chunk, future in zip(chunks, futures):
+            await slots.acquire()
+            future.add_done_callback(lambda done: slots.release())
+            await self.queue.put((chunk, future, time.perf_counter(), timings, options))
+
+    def stats(self):
+        """Возвращает текущее состояние очереди и статистику батчей."""
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "max_batch_size": self.max_batch_size,
+            "last_batch_size": self.last_batch_size,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "rejected": self.rejected,
+        }
+
+    async def _collect_batch(self):
+        """Ждет первый чанк и добирает батч до max_batch_size или max_wait."""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Сначала забираем то, что уже лежит в очереди
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """Основной цикл: сбор батча и вызов модели в отдельном потоке."""
+        while True:
+            batch = await self._collect_batch()
+            # Чанки с разными параметрами генерации нельзя выполнить одним вызовом модели
+            groups = {}
+            for item in batch:
+                groups.setdefault(self.batch_key(item[0], item[4]), []).append(item)
+            for group in groups.values():
+                await self._generate(group)
+
+    async def _generate(self, batch):
+        """Вызов модели на группе чанков с одинаковыми параметрами генерации."""
+        # Чанки отмененных запросов не отправляем в модель
+        batch = [item for item in batch if not item[1].done()]
+        if not batch:
+            return
+
+        # Ожидание в очереди: в гистограмму - по чанкам, запросу - самое долгое
+        started = time.perf_counter()
+        for _, _, enqueued_at, timings, _ in batch:
+            wait = started - enqueued_at
+            QUEUE_WAIT_SECONDS.observe(wait)
+            if timings is not None:
+                timings["queue_wait"] = round(max(timings.get("queue_wait", 0), wait), 4)
+
+        self.batches += 1
+        self.items += len(batch)
+        self.last_batch_size = len(batch)
+        BATCH_SIZE.observe(len(batch))
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.generate_fn, [item[0] for item in batch], batch[0][4]
+            )
+        except Exception as e:
+            logger.error(f"Batch inference failed: {str(e)}")
+            for item in batch:
+                if not item[1].done():
+                    item[1].set_exception(e)
+        else:
+            for item, result in zip(batch, results):
+                if not item[1].done():
+                    item[1].set_result(result)
+        finally:
+            BATCH_SECONDS.observe(time.perf_counter() - started)
+
+
+def _options_key(chunk, options):
+    """Ключ группы по умолчанию: одинаковые параметры генерации."""
+    return tuple(sorted(options.items())) if options else None
+
+
+def _notify(future, index, on_result):
+    """Передает результат готового чанка в on_result (кроме отмененных и ошибок)."""
+    if not future.cancelled() and future.exception() is None:
+        on_result(index, future.result())
@@ -0,0 +1,145 @@
+"""
+Файл serve.py — Запуск нескольких процессов uvicorn с общей моделью:
+1) Загружает модель один раз в главном процессе, процессы-обработчики наследуют ее через fork
+2) Создает слушающий сокет и запускает N процессов-обработчиков через fork
+3) Делит потоки torch между процессами, чтобы они не конкурировали за ядра
+4) Перезапускает упавшие процессы и останавливает все процессы по сигналу
+5) Задает общий каталог снимков метрик (METRICS_DIR): /metrics любого процесса
+   отдает сумму метрик всех процессов
+
+Пример запуска (из каталога backend):
+    python -m app.serve --workers 4 --port 8000
+
+"""
+
+# Импорт необходимых библиотек
+import argparse                                   # Разбор аргументов командной строки
+import gc                                         # Заморозка объектов перед fork
+import glob                                       # Снимки метрик прошлого запуска
+import logging                                    # Логирование работы процессов
+import multiprocessing                            # Процессы-обработчики (fork)
+import os                                         # Для чтения настроек из переменных окружения
+import signal                                     # Остановка по SIGTERM/SIGINT
+import shutil                                     # Удаление временного каталога метрик
+import socket                                     # Общий слушающий сокет
+import tempfile                                   # Временный каталог метрик
+from multiprocessing.connection import wait       # Ожидание завершения процессов
+import torch                                      # Потоки torch и загрузка модели до fork
+import uvicorn                                    # ASGI-сервер
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Настройки запуска
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", 1))             # Количество процессов-обработчиков
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", 0))         # Потоков torch на процесс (0 - поровну)
+
+
+def preload_model():
+    """
+    Загружает модель в главном процессе до fork.
+
+    Процессы-обработчики наследуют страницы памяти с весами через fork
+    (copy-on-write) и не копируют их, пока веса не меняются. Копия в
+    /dev/shm (share_memory) не нужна: она удвоила бы пиковую память и не
+    поместилась бы в 64 МБ /dev/shm контейнера по умолчанию. Для GPU и
+    ONNX Runtime (их состояние нельзя наследовать через fork) модель
+    загружает каждый процесс сам.
+
+    """
+    from app import main
+    from app.models import INFERENCE_BACKEND, load_summarizer
+
+    if INFERENCE_BACKEND == "onnx" or torch.cuda.is_available():
+        logger.warning(
+            f"Backend {INFERENCE_BACKEND!r} can't be shared across processes, "
+            "each worker loads its own model"
+        )
+        return
+
+    # Один поток при загрузке: пул потоков OpenMP не должен создаваться до fork
+    torch.set_num_threads(1)
+    main.summarizer, main.tokenizer = load_summarizer()
+    # Объекты, созданные до fork, сборщик мусора больше не обходит: иначе при сборке
+    # он трогает их заголовки и страницы копируются в каждый процесс
+    gc.freeze()
+    logger.info("Model preloaded, workers share its pages via fork")
+
+
+def run_worker(sock, threads):
+    """Процесс-обработчик: uvicorn на унаследованном сокете."""
+    from app.main import app
+
+    torch.set_num_threads(threads)
+    config = uvicorn.Config(app, log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    """Точка входа: загрузка модели, запуск и контроль процессов-обработчиков."""
+    parser = argparse.ArgumentParser(description="Запуск API в нескольких процессах с общей моделью")
+    parser.add_argument("--host", default="0.0.0.0", help="Адрес для прослушивания")
+    parser.add_argument("--port", type=int, default=8000, help="Порт")
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS, help="Количество процессов")
+    args = parser.parse_args()
+
+    threads = TORCH_THREADS or max(1, (os.cpu_count() or 1) // args.workers)
+    logger.info(f"Starting {args.workers} workers, {threads} torch threads each")
+
+    # Каталог снимков метрик задается до импорта app.metrics (preload_model и процессы)
+    metrics_dir = os.getenv("METRICS_DIR")
+    temporary_metrics_dir = not metrics_dir
+    if temporary_metrics_dir:
+        metrics_dir = tempfile.mkdtemp(prefix="summarizer-metrics-")
+        os.environ["METRICS_DIR"] = metrics_dir
+    else:
+        # Счетчики нового запуска начинаются с нуля
+        os.makedirs(metrics_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(metrics_dir, "*.json")):
+            os.remove(path)
+    preload_model()
+
+    # Сокет создается до fork - все процессы принимают соединения на одном порту
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.set_inheritable(True)
+
+    context = multiprocessing.get_context("fork")
+
+    def start_worker():
+        process = context.Process(target=run_worker, args=(sock, threads))
+        process.start()
+        return process
+
+    workers = [start_worker() for _ in range(args.workers)]
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Перезапускаем упавшие процессы, пока не пришел сигнал остановки
+    while not stopping:
+        wait([process.sentinel for process in workers], timeout=1)
+        for i, process in enumerate(workers):
+            if not process.is_alive() and not stopping:
+                logger.warning(f"Worker {process.pid} exited with code {process.exitcode}, restarting")
+                workers[i] = start_worker()
+
+    logger.info("Stopping workers...")
+    for process in workers:
+        process.terminate()
+    for process in workers:
+        process.join()
+    sock.close()
+    if temporary_metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+# Запуск при прямом выполнении модуля
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Файл run.py — Бенчмарк пайплайна суммаризации:
+1) Скорость разбиения текста (split_text) в зависимости от размера документа
+2) Время summarize_long_text и скорость обработки токенов
+3) Перцентили задержки /summarize при разной конкурентности запросов
+4) Пиковое потребление памяти (RSS)
+
+Работает офлайн: по умолчанию создает крошечную случайную BART-модель
+с собственным BPE-токенизатором (нужны только transformers и tokenizers).
+Результаты пишутся в JSON, два запуска можно сравнить.
+
+Примеры запуска (из каталога backend):
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --compare before.json after.json
+
+"""
+
+# Импорт необходимых библиотек
+import argparse                                   # Разбор аргументов командной строки
+import asyncio                                    # Конкурентные запросы к API
+import json                                       # Запись и чтение результатов
+import os                                         # Переменные окружения и пути
+import platform                                   # Описание окружения запуска
+import random                                     # Синтетические документы
+import resource                                   # Пиковое потребление памяти
+import statistics                                 # Перцентили задержки
+import tempfile                                   # Каталог для крошечной модели и базы задач
+import time                                       # Замер времени
+
+# Размеры синтетических документов в словах: от новости до книги
+CORPUS_SIZES = {
+    "news": 400,
+    "report": 5000,
+    "long": 50000,
+    "book": 300000,
+}
+
+# Словарь синтетических документов
+WORDS = (
+    "the a of and to in market company government report people city year said new first "
+    "data system news world state week day growth price policy research team project plan "
+    "result value energy water health school public service economy industry network"
+).split()
+
+
+def make_document(words, seed):
+    """Генерирует синтетический документ из предложений по 8-30 слов."""
+    rng = random.Random(seed)
+    sentences = []
+    count = 0
+    while count < words:
+        length = rng.randint(8, 30)
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + rng.choice(".!?"))
+        count += length
+    return " ".join(sentences)
+
+
+def build_tiny_model(path):
+    """
+    Создает крошечную случайную BART-модель и BPE-токенизатор в path.
+
+    Модель не дает осмысленных суммаризаций, но проходит тот же путь
+    (токенизация, батчи, generate с beam search), что и BART-large-CNN.
+
+    """
+    from tokenizers import ByteLevelBPETokenizer
+    from transformers import BartConfig, BartForConditionalGeneration, BartTokenizerFast
+    import torch
+
+    os.makedirs(path, exist_ok=True)
+    corpus = [make_document(200, seed) for seed in range(50)]
+    bpe = ByteLevelBPETokenizer()
+    bpe.train_from_iterator(corpus, vocab_size=1000,
+                            special_tokens=["<s>", "<pad>", "</s>", "<unk>", "<mask>"])
+    bpe.save_model(path)
+    tokenizer = BartTokenizerFast(vocab_file=os.path.join(path, "vocab.json"),
+                                  merges_file=os.path.join(path, "merges.txt"))
+    tokenizer.save_pretrained(path)
+
+    torch.manual_seed(0)
+    config = BartConfig(
+        vocab_size=len(tokenizer), d_model=64, encoder_layers=2, decoder_layers=2,
+        encoder_attention_heads=4, decoder_attention_heads=4, encoder_ffn_dim=128,
+        decoder_ffn_dim=128, max_position_embeddings=1024,
+    )
+    model = BartForConditionalGeneration(config)
+    model.generation_config.num_beams = 4
+    model.generation_config.no_repeat_ngram_size = 3
+    model.generation_config.forced_bos_token_id = 0
+    model.save_pretrained(path)
+
+
+def peak_rss_mb():
+    """Пиковый RSS процесса в МБ (ru_maxrss в Linux - в КБ)."""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def percentiles(values):
+    """p50/p90/p99 и среднее для списка задержек в секундах."""
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99),
+            "mean": round(statistics.mean(ordered), 4)}
+
+
+def bench_chunking(tokenizer, sizes, repeats):
+    """Скорость split_text для документов разного размера."""
+    from app.models import split_text
+
+    results = []
+    for name, words in sizes.items():
+        text = make_document(words, seed=words)
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            chunks = split_text(text, tokenizer)
+            timings.append(time.perf_counter() - started)
+        seconds = min(timings)
+        tokens = sum(len(chunk) for chunk in chunks)
+        results.append({
+            "corpus": name,
+            "words": words,
+            "chars": len(text),
+            "chunks": len(chunks),
+            "chunk_tokens": tokens,
+            "seconds": round(seconds, 4),
+            "chars_per_second": round(len(text) / seconds),
+        })
+    return results
+
+
+def bench_pipeline(summarizer, tokenizer, sizes):
+    """Время summarize_long_text и скорость обработки входных токенов."""
+    from app.models import split_text, summarize_long_text
+
+    results = []
+    for name, words in sizes.items():
+        text = make_document(words, seed=words + 1)
+        input_tokens = sum(len(chunk) for chunk in split_text(text, tokenizer))
+        started = time.perf_counter()
+        summarize_long_text(text, summarizer, tokenizer)
+        seconds = time.perf_counter() - started
+        results.append({
+            "corpus": name,
+            "words": words,
+            "input_tokens": input_tokens,
+            "seconds": round(seconds, 4),
+            "tokens_per_second": round(input_tokens / seconds),
+        })
+    return results
+
+
+async def bench_endpoint(concurrency_levels, requests_per_level, words):
+    """Перцентили задержки /summarize при разной конкурентности (приложение в процессе)."""
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("Для бенчмарка API нужен пакет httpx (pip install httpx)")
+    from app import main
+
+    results = []
+    async with main.app.router.lifespan_context(main.app):
+        # Модель загружается в фоне - ждем готовности
+        while not main.startup_state["ready"]:
+            if main.startup_state["error"]:
+                raise RuntimeError(main.startup_state["error"])
+            await asyncio.sleep(0.1)
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                     timeout=None) as client:
+            seed = 0
+            for concurrency in concurrency_levels:
+                semaphore = asyncio.Semaphore(concurrency)
+                latencies = []
+
+                async def one_request(text):
+                    async with semaphore:
+                        started = time.perf_counter()
+                        response = await client.post("/summarize", json={"text": text})
+                        response.raise_for_status()
+                        latencies.append(time.perf_counter() - started)
+
+                # Разные документы в каждом запросе, чтобы не попадать в кэш
+                texts = [make_document(words, seed=10000 + seed + i)
+                         for i in range(requests_per_level)]
+                seed += requests_per_level
+                started = time.perf_counter()
+                await asyncio.gather(*(one_request(text) for text in texts))
+                elapsed = time.perf_counter() - started
+
+                results.append({
+                    "concurrency": concurrency,
+                    "requests": requests_per_level,
+                    "words": words,
+                    "requests_per_second": round(requests_per_level / elapsed, 3),
+                    "latency": percentiles(latencies),
+                    "scheduler": main.scheduler.stats(),
+                })
+    return results
+
+
+def compare(before_path, after_path):
+    """Печатает относительное изменение метрик между двумя запусками."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def rows(report):
+        for item in report.get("chunking", []):
+            yield f"chunking/{item['corpus']}/seconds", item["seconds"]
+        for item in report.get("pipeline", []):
+            yield f"pipeline/{item['corpus']}/seconds", item["seconds"]
+        for item in report.get("endpoint", []):
+            for name, value in item["latency"].items():
+                yield f"endpoint/c{item['concurrency']}/latency_{name}", value
+            yield f"endpoint/c{item['concurrency']}/requests_per_second", item["requests_per_second"]
+        yield "peak_rss_mb", report.get("peak_rss_mb")
+
+    old = dict(rows(before))
+    for key, value in rows(after):
+        if key in old and old[key] and value is not None:
+            change = (value - old[key]) / old[key] * 100
+            print(f"{key:50} {old[key]:>12} -> {value:>12}  ({change:+.1f}%)")
+
+
+def main():
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк пайплайна суммаризации")
+    parser.add_argument("--output", default="bench.json", help="JSON-файл с результатами")
+    parser.add_argument("--model", default=None,
+                        help="Путь к локальной модели (по умолчанию - крошечная случайная BART)")
+    parser.add_argument("--quick", action="store_true", help="Без документа размера книги")
+    parser.add_argument("--concurrency", default="1,4,16", help="Уровни конкурентности API")
+    parser.add_argument("--requests", type=int, default=32, help="Запросов на уровень конкурентности")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="Сравнить два файла результатов и выйти")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # Временный каталог запуска: крошечная модель и база задач
+    work_dir = tempfile.mkdtemp(prefix="summarizer-bench-")
+    model_path = args.model
+    if model_path is None:
+        model_path = os.path.join(work_dir, "tiny-bart")
+        build_tiny_model(model_path)
+
+    # Настройки читаются при импорте модулей приложения - задаем их заранее
+    os.environ["MODEL_NAME"] = model_path
+    os.environ.pop("CACHE_DIR", None)
+    os.environ["JOBS_DB"] = os.path.join(work_dir, "jobs.sqlite3")
+    os.environ.setdefault("WARMUP_LENGTHS", "")
+
+    from app.models import load_summarizer
+
+    sizes = dict(CORPUS_SIZES)
+    if args.quick:
+        sizes.pop("book")
+
+    summarizer, tokenizer = load_summarizer()
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model": args.model or "tiny-random-bart",
+        },
+        "chunking": bench_chunking(tokenizer, sizes, repeats=3),
+    }
+    report["pipeline"] = bench_pipeline(summarizer, tokenizer, sizes)
+    report["endpoint"] = asyncio.run(bench_endpoint(
+        [int(level) for level in args.concurrency.split(",")], args.requests,
+        CORPUS_SIZES["news"]
+    ))
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+# Запуск при прямом выполнении модуля
+if __name__ == "__main__":
+    main()
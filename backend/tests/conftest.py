@@ -0,0 +1,49 @@
+"""
+Файл conftest.py — Общие фикстуры тестов:
+1) Токенизатор-заглушка: токен - слово, с offset mapping как у быстрого токенизатора
+
+"""
+
+# Импорт необходимых библиотек
+import re                                         # Разбиение текста на слова
+import pytest                                     # Фикстуры
+
+
+class StubTokenizer:
+    """
+    Токенизатор-заглушка для тестов без модели.
+
+    Токен - последовательность непробельных символов, ID - порядковый номер
+    слова в словаре (новые слова добавляются по мере появления). Служебных
+    токенов два, как у BART (<s> и </s>).
+
+    """
+
+    def __init__(self):
+        self.vocabulary = {}
+
+    def _encode(self, text):
+        words = list(re.finditer(r'\S+', text))
+        input_ids = [self.vocabulary.setdefault(word.group(), len(self.vocabulary)) for word in words]
+        return input_ids, [word.span() for word in words]
+
+    def __call__(self, text, add_special_tokens=True, return_offsets_mapping=False):
+        encoded = [self._encode(item) for item in ([text] if isinstance(text, str) else text)]
+        result = {"input_ids": [input_ids for input_ids, _ in encoded]}
+        if return_offsets_mapping:
+            result["offset_mapping"] = [offsets for _, offsets in encoded]
+        if isinstance(text, str):
+            result = {name: values[0] for name, values in result.items()}
+        return result
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def decode(self, input_ids):
+        words = {index: word for word, index in self.vocabulary.items()}
+        return ' '.join(words[index] for index in input_ids)
+
+
+@pytest.fixture
+def tokenizer():
+    return StubTokenizer()
@@ -0,0 +1,50 @@
+"""
+Файл test_budget.py — Тесты подстройки генерации под бюджет времени (budget_generation_options):
+1) При достаточном бюджете параметры не меняются
+2) При нехватке времени beam search заменяется жадным декодированием
+3) Если и жадного мало, target_length уменьшается, но не ниже минимума
+
+Запуск (из каталога backend):
+    python -m pytest -q
+
+"""
+
+# Импорт необходимых библиотек
+from app.models import (                          # Тестируемая функция и параметры генерации
+    BUDGET_MIN_LENGTH, budget_generation_options, generation_options
+)
+
+
+def test_options_kept_within_budget():
+    options = generation_options(num_beams=4, target_length=128)
+    assert budget_generation_options(options, 10, 0.5, 6.0) is options
+    # Без оценки времени (батчей еще не было) бюджет не применяется
+    assert budget_generation_options(options, 10, None, 0.1) is options
+
+
+def test_greedy_fallback_when_beams_do_not_fit():
+    options = generation_options(num_beams=4, target_length=128)
+    level = budget_generation_options(options, 10, 0.5, 2.0)
+    # 10 × 0.5 с = 5 с > 2 с; жадное декодирование ~ в 4 раза быстрее - 1.25 с
+    assert level["num_beams"] == 1
+    assert level["target_length"] == 128
+    assert options["num_beams"] == 4
+
+
+def test_model_default_beams_used_when_not_set():
+    options = generation_options(target_length=128)
+    assert budget_generation_options(options, 10, 0.5, 2.0, model_beams=4)["num_beams"] == 1
+    # Модель и так жадная: остается только сокращение длины
+    level = budget_generation_options(options, 10, 0.5, 2.0, model_beams=1)
+    assert level["num_beams"] is None
+    assert level["target_length"] < 128
+
+
+def test_target_length_shrinks_to_minimum():
+    options = generation_options(num_beams=2, target_length=128)
+    level = budget_generation_options(options, 10, 1.0, 2.5)
+    # После жадного 5 с > 2.5 с: длина уменьшается вдвое
+    assert level == dict(options, num_beams=1, target_length=64)
+    # Бюджет исчерпан: минимальная длина
+    level = budget_generation_options(options, 10, 1.0, -1.0)
+    assert level["target_length"] == BUDGET_MIN_LENGTH
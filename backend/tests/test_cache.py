@@ -0,0 +1,92 @@
+"""
+Файл test_cache.py — Тесты кэша суммаризаций:
+1) Обертка cached генерирует только отсутствующие в кэше чанки
+2) Дисковый кэш переживает пересоздание объекта кэша
+3) После правки одного предложения в модель идут только затронутые части
+4) Ключ документа различает тексты, отличающиеся только пробелами
+
+Запуск (из каталога backend):
+    python -m pytest -q
+
+"""
+
+# Импорт необходимых библиотек
+import asyncio                                    # Запуск асинхронной обертки
+import random                                     # Предложения случайной длины
+from app.cache import SummaryCache, document_key  # Тестируемый кэш и ключи документов
+from app.models import summarize_tree             # Дерево суммаризации с кэшем чанков
+
+
+def fake_generate(calls):
+    """Генерация-заглушка: записывает входы и возвращает их длины строками."""
+    async def generate(chunks, on_result=None):
+        calls.append(chunks)
+        summaries = [str(len(chunk)) for chunk in chunks]
+        if on_result is not None:
+            for index, summary in enumerate(summaries):
+                on_result(index, summary)
+        return summaries
+    return generate
+
+
+def test_cached_generates_only_missing_chunks(tmp_path):
+    params = {"model": "test"}
+    calls = []
+    cache = SummaryCache(cache_dir=str(tmp_path))
+    asyncio.run(cache.cached(fake_generate(calls), params)([[1], [1, 2]]))
+
+    # Новый объект кэша: память пуста, чанки находятся на диске
+    cache = SummaryCache(cache_dir=str(tmp_path))
+    seen = {}
+    generate = cache.cached(fake_generate(calls), params)
+    summaries = asyncio.run(generate([[1, 2], [1, 2, 3], [1]], seen.__setitem__))
+
+    assert summaries == ["2", "3", "1"]
+    assert calls == [[[1], [1, 2]], [[1, 2, 3]]]
+    assert seen == {0: "2", 1: "3", 2: "1"}
+    assert cache.stats()["disk_hits"] == 2
+
+
+def test_async_document_get_and_put(tmp_path):
+    async def scenario():
+        cache = SummaryCache(cache_dir=str(tmp_path))
+        await cache.put_async("key", "summary")
+        assert await SummaryCache(cache_dir=str(tmp_path)).get_async("key") == "summary"
+        assert await cache.get_async("missing") is None
+
+    asyncio.run(scenario())
+
+
+def test_edited_sentence_regenerates_only_affected_chunks(tokenizer):
+    random.seed(0)
+    sentences = [' '.join(f"s{index}w{word}" for word in range(random.randint(5, 25))) + '.'
+                 for index in range(150)]
+    edited = list(sentences)
+    # Вставка меняет длину предложения: при жадных границах от начала текста
+    # сдвинулись бы все следующие части (здесь - 14 из 29)
+    edited[75] = edited[75].replace("w2 ", "w2 one two three four five six ", 1)
+
+    cache = SummaryCache(cache_dir=None)
+    level_calls = []
+
+    async def generate(chunks, on_result=None):
+        level_calls.append(len(chunks))
+        return [tokenizer.decode(chunk[:5]) for chunk in chunks]
+
+    def run(text):
+        level_calls.clear()
+        asyncio.run(summarize_tree(text, tokenizer, cache.cached(generate, {"model": "test"}),
+                                   max_length=128, max_depth=0))
+        return level_calls[0]
+
+    total = run(' '.join(sentences))
+    assert total >= 10
+    # Границы частей после правки совпадают с прежними: в модель идет только часть с правкой
+    # (и, если граница сдвинулась, соседняя)
+    assert 1 <= run(' '.join(edited)) <= 2
+
+
+def test_document_key_keeps_whitespace_differences():
+    params = {"model": "test"}
+    assert document_key("", params) != document_key("   \n ", params)
+    assert document_key("A b.\n\nC d.", params) != document_key("A b. C d.", params)
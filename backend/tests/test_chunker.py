@@ -0,0 +1,74 @@
+"""
+Файл test_chunker.py — Тесты разбиения текста на части (split_text):
+1) Каждая часть помещается в бюджет модели с учетом служебных токенов
+2) Части идут подряд, без пропусков, и покрывают весь текст
+3) Перекрытие не длиннее overlap, начало каждой части сдвигается вперед
+4) Предложения длиннее бюджета режутся, разбиение завершается
+
+Запуск (из каталога backend):
+    python -m pytest -q
+
+"""
+
+# Импорт необходимых библиотек
+import random                                     # Предложения случайной длины
+import pytest                                     # Параметризация тестов
+from app.models import split_text                 # Тестируемое разбиение
+
+
+def make_text(sentence_lengths):
+    """Текст из предложений заданной длины; все слова разные (w0, w1, ...)."""
+    words = 0
+    sentences = []
+    for length in sentence_lengths:
+        sentences.append(' '.join(f"w{words + i}" for i in range(length)) + '.')
+        words += length
+    return ' '.join(sentences), words
+
+
+def check_chunks(chunks, total, budget, overlap):
+    """Проверяет бюджет, покрытие текста и перекрытие частей."""
+    # ID слов wN совпадают с N: часть - отрезок [start, end) текста
+    spans = []
+    for chunk in chunks:
+        assert 0 < len(chunk) <= budget
+        assert chunk == list(range(chunk[0], chunk[0] + len(chunk)))
+        spans.append((chunk[0], chunk[0] + len(chunk)))
+
+    assert spans[0][0] == 0
+    assert spans[-1][1] == total
+    for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+        assert start < next_start <= end        # Без пропусков, с продвижением вперед
+        assert end - next_start <= overlap      # Перекрытие не длиннее overlap
+        assert next_end > end
+    return spans
+
+
+@pytest.mark.parametrize("overlap", [0, 10, 50])
+def test_chunks_fit_budget_and_cover_text(tokenizer, overlap):
+    random.seed(overlap)
+    text, total = make_text([random.randint(1, 40) for _ in range(300)])
+    chunks = split_text(text, tokenizer, max_length=64, overlap=overlap)
+    spans = check_chunks(chunks, total, budget=62, overlap=overlap)
+    if overlap:
+        # Перекрытие действительно переносится в следующую часть
+        assert any(end > next_start for (_, end), (next_start, _) in zip(spans, spans[1:]))
+
+
+@pytest.mark.parametrize("lengths", [[500], [3, 500, 3], [61, 62, 63, 200, 1]])
+def test_sentences_longer_than_budget_make_progress(tokenizer, lengths):
+    text, total = make_text(lengths)
+    chunks = split_text(text, tokenizer, max_length=64, overlap=10)
+    check_chunks(chunks, total, budget=62, overlap=10)
+
+
+def test_overlap_larger_than_budget_terminates(tokenizer):
+    text, total = make_text([5] * 100)
+    chunks = split_text(text, tokenizer, max_length=32, overlap=1000)
+    # Перекрытие ограничено тем, что следующее предложение должно поместиться в часть
+    check_chunks(chunks, total, budget=30, overlap=30)
+
+
+def test_short_text_is_one_chunk(tokenizer):
+    text, total = make_text([5, 7])
+    assert split_text(text, tokenizer, max_length=64) == [list(range(total))]
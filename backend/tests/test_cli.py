@@ -0,0 +1,34 @@
+"""
+Файл test_cli.py — Тесты контрольной точки офлайн-суммаризации (load_checkpoint):
+1) Документы с ошибкой не считаются обработанными и повторяются при следующем запуске
+2) Недописанная последняя строка отрезается
+
+Запуск (из каталога backend):
+    python -m pytest -q
+
+"""
+
+# Импорт необходимых библиотек
+import json                                       # Строки выходного JSONL
+from app.cli import load_checkpoint               # Тестируемая контрольная точка
+
+
+def test_failed_documents_are_retried(tmp_path):
+    output = tmp_path / "summaries.jsonl"
+    records = [
+        {"id": "a", "summary": "ok"},
+        {"id": "b", "error": "CUDA out of memory"},
+        {"id": "c", "error": "timeout"},
+        # Повторный запуск уже обработал c
+        {"id": "c", "summary": "ok"},
+    ]
+    output.write_text("".join(json.dumps(record) + "\n" for record in records))
+    assert load_checkpoint(str(output)) == {"a", "c"}
+
+
+def test_partial_last_line_is_truncated(tmp_path):
+    output = tmp_path / "summaries.jsonl"
+    output.write_text('{"id": "a", "summary": "ok"}\n{"id": "b", "summ')
+    assert load_checkpoint(str(output)) == {"a"}
+    assert output.read_text() == '{"id": "a", "summary": "ok"}\n'
+    assert load_checkpoint(str(tmp_path / "missing.jsonl")) == set()
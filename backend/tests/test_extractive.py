@@ -0,0 +1,65 @@
+"""
+Файл test_extractive.py — Тесты экстрактивного отбора предложений:
+1) TextRank выше оценивает предложения, похожие на остальные
+2) Отобранный текст укладывается в бюджет и сохраняет исходный порядок предложений
+3) Если не помещается ни одно предложение, остается начало самого центрального
+
+Запуск (из каталога backend):
+    python -m pytest -q
+
+"""
+
+# Импорт необходимых библиотек
+import numpy as np                                # Проверка оценок
+import pytest                                     # Параметризация тестов
+from app.extractive import condense, split_sentences, textrank_scores  # Тестируемые функции
+
+# Три предложения о кэше (центральные) и два посторонних
+TEXT = (
+    "The cache stores chunk summaries on disk. "
+    "Zebras graze quietly near the river. "
+    "Chunk summaries in the cache are reused after edits. "
+    "Volcanic ash covered the distant island. "
+    "The disk cache keeps chunk summaries between restarts."
+)
+
+
+def test_textrank_prefers_central_sentences():
+    scores = textrank_scores(split_sentences(TEXT))
+    assert scores.sum() == pytest.approx(1)
+    # Каждое предложение о кэше выше каждого постороннего
+    assert min(scores[[0, 2, 4]]) > max(scores[[1, 3]])
+
+
+@pytest.mark.parametrize("max_tokens", [8, 16, 20, 30])
+def test_condense_fits_budget_in_original_order(tokenizer, max_tokens):
+    sentences = split_sentences(TEXT)
+    result = condense(TEXT, tokenizer, max_tokens=max_tokens)
+    assert len(tokenizer(result, add_special_tokens=False)['input_ids']) <= max_tokens
+
+    kept = split_sentences(result)
+    positions = [sentences.index(sentence) for sentence in kept]
+    assert positions == sorted(positions)
+    # Посторонние предложения попадают только после всех центральных
+    if 1 in positions or 3 in positions:
+        assert {0, 2, 4} <= set(positions)
+
+
+def test_condense_keeps_central_sentences(tokenizer):
+    # 24 токена: помещаются три предложения о кэше (7 + 8 + 8), посторонние - нет
+    result = condense(TEXT, tokenizer, max_tokens=24)
+    sentences = split_sentences(TEXT)
+    assert split_sentences(result) == [sentences[0], sentences[2], sentences[4]]
+
+
+def test_condense_truncates_top_sentence_when_nothing_fits(tokenizer):
+    sentences = split_sentences(TEXT)
+    top = sentences[int(np.argmax(textrank_scores(sentences)))]
+    result = condense(TEXT, tokenizer, max_tokens=4)
+    # Не самое короткое предложение, а начало самого центрального
+    assert result == ' '.join(top.split()[:4])
+
+
+def test_condense_returns_text_within_budget(tokenizer):
+    assert condense(TEXT, tokenizer, max_tokens=1000) == TEXT
+    assert condense(TEXT, tokenizer, ratio=1.0) == TEXT
@@ -0,0 +1,185 @@
+"""
+Файл test_jobs.py — Тесты асинхронных задач:
+1) Ошибка базы при получении задачи не останавливает обработчик
+2) Завершенные задачи старше срока хранения удаляются
+3) Продолжение задачи после перезапуска: готовые чанки не отправляются в модель
+4) Ожидание блокировки базы не останавливает event loop
+
+Запуск (из каталога backend):
+    python -m pytest -q
+
+"""
+
+# Импорт необходимых библиотек
+import asyncio                                    # Запуск обработчиков задач
+import sqlite3                                    # Ошибка и блокировка базы в тестах
+import threading                                  # Снятие блокировки базы по таймеру
+import time                                       # Возраст задач
+import pytest                                     # Проверка исключений
+from app import jobs                              # Тестируемые хранилище и обработчики
+from app.models import summarize_tree             # Дерево суммаризации, которое продолжает задача
+
+
+def test_cleanup_removes_only_old_finished_jobs(tmp_path):
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"))
+    old_done = store.create({"text": "a"})
+    old_failed = store.create({"text": "b"})
+    fresh_done = store.create({"text": "c"})
+    old_queued = store.create({"text": "d"})
+    store.finish(old_done, "summary", [])
+    store.fail(old_failed, "error")
+    store.finish(fresh_done, "summary", [])
+    store._execute("UPDATE jobs SET updated = ? WHERE id != ?", (time.time() - 100, fresh_done))
+
+    assert store.cleanup(retention_seconds=50) == 2
+    assert store.get(old_done) is None
+    assert store.get(old_failed) is None
+    assert store.get(fresh_done)["status"] == "done"
+    assert store.get(old_queued)["status"] == "queued"
+
+
+def test_worker_survives_claim_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_POLL_SECONDS", 0.01)
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create({"text": "a"})
+
+    claim = store.claim
+    failures = []
+
+    def flaky_claim():
+        if not failures:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        return claim()
+
+    monkeypatch.setattr(store, "claim", flaky_claim)
+
+    async def run(request, checkpoint):
+        return request["text"].upper(), []
+
+    async def scenario():
+        runner = jobs.JobRunner(store, run, workers=1)
+        await runner.start()
+        for _ in range(100):
+            if store.get(job_id)["status"] == "done":
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+
+    asyncio.run(scenario())
+    assert failures == [1]
+    assert store.get(job_id)["summary"] == "A"
+
+
+def make_text(sentences):
+    """Текст из предложений по 10 разных слов."""
+    return ' '.join(' '.join(f"w{i * 10 + j}" for j in range(10)) + '.' for i in range(sentences))
+
+
+def fake_generate(tokenizer, calls, fail_after=None):
+    """
+    Генерация-заглушка: суммаризация чанка - его первые 20 слов.
+
+    Все входы записываются в calls; после fail_after готовых чанков
+    генерация падает, как процесс, остановленный посреди задачи.
+
+    """
+    async def generate(chunks, on_result=None):
+        calls.extend(chunks)
+        summaries = []
+        for index, chunk in enumerate(chunks):
+            if fail_after is not None and len(summaries) >= fail_after:
+                raise RuntimeError("Процесс остановлен")
+            summaries.append(tokenizer.decode(chunk[:20]))
+            if on_result is not None:
+                on_result(index, summaries[-1])
+        return summaries
+    return generate
+
+
+def run_tree(text, tokenizer, generate):
+    summary, levels = asyncio.run(
+        summarize_tree(text, tokenizer, generate, max_length=64, target_length=40)
+    )
+    return summary, levels
+
+
+def test_resume_after_all_chunks_makes_no_model_calls(tmp_path, tokenizer):
+    path = str(tmp_path / "jobs.sqlite3")
+    text = make_text(60)
+    store = jobs.JobStore(path)
+    job_id = store.create({"text": text})
+
+    calls = []
+    summary, levels = run_tree(text, tokenizer,
+                               store.checkpoint(job_id)(fake_generate(tokenizer, calls)))
+    assert len(levels) > 1                      # Проверяем и map, и reduce
+    store.close()
+
+    # После перезапуска все чанки всех уровней берутся из базы
+    store = jobs.JobStore(path)
+
+    async def no_model(chunks, on_result=None):
+        raise AssertionError(f"Вызов модели на {len(chunks)} чанках")
+
+    assert run_tree(text, tokenizer, store.checkpoint(job_id)(no_model))[0] == summary
+    job = store.get(job_id)
+    assert job["progress"]["chunks_done"] == job["progress"]["chunks_total"]
+
+
+def test_resume_sends_only_missing_chunks(tmp_path, tokenizer):
+    path = str(tmp_path / "jobs.sqlite3")
+    text = make_text(60)
+    expected, _ = run_tree(text, tokenizer, fake_generate(tokenizer, []))
+
+    store = jobs.JobStore(path)
+    job_id = store.create({"text": text})
+    first_calls = []
+    with pytest.raises(RuntimeError):
+        run_tree(text, tokenizer, store.checkpoint(job_id, slice_size=8)(
+            fake_generate(tokenizer, first_calls, fail_after=5)
+        ))
+    saved = store.chunks(job_id, 0)
+    assert len(saved) == 5
+    store.close()
+
+    store = jobs.JobStore(path)
+    calls = []
+    summary, levels = run_tree(text, tokenizer, store.checkpoint(job_id, slice_size=8)(
+        fake_generate(tokenizer, calls)
+    ))
+    assert summary == expected
+    # Уровень 0: в модель идут только чанки, не сохраненные до остановки
+    map_calls = calls[:levels[0]["inputs"] - len(saved)]
+    assert not any(chunk in map_calls for chunk in first_calls[:5])
+    assert len(calls) == sum(level["inputs"] for level in levels) - len(saved)
+
+
+def test_store_lock_wait_does_not_block_event_loop(tmp_path, tokenizer):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = jobs.JobStore(path)
+    job_id = store.create({"text": "a"})
+    # Другой процесс держит блокировку записи 0.5 с
+    blocker = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.5, blocker.execute, ("COMMIT",)).start()
+
+    async def scenario():
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+
+        ticking = asyncio.create_task(ticker())
+        await asyncio.sleep(0)
+        generate = store.checkpoint(job_id)(fake_generate(tokenizer, []))
+        await summarize_tree(make_text(60), tokenizer, generate, max_length=64, target_length=40)
+        ticking.cancel()
+        return ticks
+
+    ticks = asyncio.run(scenario())
+    assert ticks[-1] - ticks[0] >= 0.4          # Задача ждала блокировку
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.2
+    assert store.chunks(job_id, 0)
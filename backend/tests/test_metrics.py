@@ -0,0 +1,67 @@
+"""
+Файл test_metrics.py — Тесты метрик Prometheus:
+1) /metrics нескольких процессов - сумма их снимков в METRICS_DIR
+2) Снимок завершившегося процесса остается в счетчиках, но не в gauge-метриках
+
+Запуск (из каталога backend):
+    python -m pytest -q
+
+"""
+
+# Импорт необходимых библиотек
+import json                                       # Снимок другого процесса
+import os                                         # ID процесса
+import pytest                                     # Фикстуры
+from app import metrics                           # Тестируемые метрики
+
+
+@pytest.fixture
+def registry(monkeypatch, tmp_path):
+    """Отдельный реестр метрик и каталог снимков на время теста."""
+    monkeypatch.setattr(metrics, "_registry", [])
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def write_other_process(directory, pid, values):
+    with open(os.path.join(directory, f"{pid}.json"), "w", encoding="utf-8") as f:
+        json.dump({"pid": pid, "metrics": values}, f)
+
+
+def test_render_sums_snapshots_of_all_processes(registry):
+    requests = metrics.Counter("test_requests_total", "Requests", ["status"])
+    latency = metrics.Histogram("test_seconds", "Latency", buckets=(1, 10))
+    depth = metrics.Gauge("test_depth", "Depth")
+    requests.inc(status=200)
+    latency.observe(0.5)
+    depth.set(3)
+
+    # Живой процесс (родитель тестового процесса) и завершившийся процесс
+    write_other_process(registry, os.getppid(), {
+        "test_requests_total": [[[["status", 200]], 2]],
+        "test_seconds": [[[], [[0, 1], 5, 1]]],
+        "test_depth": [[[], 4]],
+    })
+    dead_pid = 2 ** 22 + 12345
+    assert not metrics._process_alive(dead_pid)
+    write_other_process(registry, dead_pid, {
+        "test_requests_total": [[[["status", 200]], 5], [[["status", 503]], 1]],
+        "test_depth": [[[], 100]],
+    })
+
+    lines = metrics.render().splitlines()
+    assert 'test_requests_total{status="200"} 8' in lines
+    assert 'test_requests_total{status="503"} 1' in lines
+    assert 'test_seconds_bucket{le="1"} 1' in lines
+    assert 'test_seconds_bucket{le="10"} 2' in lines
+    assert "test_seconds_sum 5.5" in lines
+    assert "test_seconds_count 2" in lines
+    # Глубина очереди завершившегося процесса не учитывается
+    assert "test_depth 7" in lines
+
+
+def test_render_without_metrics_dir_is_local(registry, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", None)
+    metrics.Counter("test_local_total", "Local").inc(3)
+    write_other_process(registry, os.getppid(), {"test_local_total": [[[], 10]]})
+    assert "test_local_total 3" in metrics.render().splitlines()
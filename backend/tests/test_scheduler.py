@@ -0,0 +1,84 @@
+"""
+Файл test_scheduler.py — Тесты планировщика инференса:
+1) Запрос больше очереди выполняется окном, а не отклоняется
+2) Окно большого запроса не занимает очередь целиком
+3) Небольшой запрос при заполненной очереди отклоняется целиком
+
+Запуск (из каталога backend):
+    python -m pytest -q
+
+"""
+
+# Импорт необходимых библиотек
+import asyncio                                    # Запуск корутин планировщика
+import pytest                                     # Проверка исключений
+from app.scheduler import InferenceScheduler, QueueFullError  # Тестируемый планировщик
+
+
+def run_scheduler(scheduler, coroutine_fn):
+    """Запускает планировщик, выполняет coroutine_fn(scheduler) и останавливает его."""
+    async def scenario():
+        await scheduler.start()
+        try:
+            return await coroutine_fn(scheduler)
+        finally:
+            await scheduler.stop()
+    return asyncio.run(scenario())
+
+
+def test_request_larger_than_queue_completes():
+    depths = []
+
+    def generate(chunks, options):
+        depths.append(scheduler.queue.qsize())
+        return [chunk.upper() for chunk in chunks]
+
+    scheduler = InferenceScheduler(generate, max_batch_size=8, max_wait_ms=1,
+                                   max_queue_size=100)
+    chunks = [f"chunk {index}" for index in range(250)]
+    results = run_scheduler(scheduler, lambda s: s.submit(chunks))
+
+    assert results == [chunk.upper() for chunk in chunks]
+    assert scheduler.rejected == 0
+    # В очереди не больше окна запроса (четверть очереди)
+    assert max(depths) <= scheduler.max_request_chunks == 25
+
+
+def test_small_request_rejected_when_queue_full():
+    scheduler = InferenceScheduler(lambda chunks, options: chunks, max_queue_size=10)
+
+    async def scenario(scheduler):
+        # Фоновая задача не забирает чанки, пока мы не отдадим управление
+        for index in range(8):
+            scheduler.queue.put_nowait((index, asyncio.get_running_loop().create_future(),
+                                        0, None, None))
+        with pytest.raises(QueueFullError):
+            await scheduler.submit(["a", "b", "c"])
+
+    run_scheduler(scheduler, scenario)
+    assert scheduler.rejected == 3
+
+
+def test_on_result_reports_every_chunk_of_large_request():
+    scheduler = InferenceScheduler(lambda chunks, options: chunks, max_batch_size=4,
+                                   max_wait_ms=1, max_queue_size=16)
+    seen = {}
+    chunks = list(range(40))
+    run_scheduler(scheduler, lambda s: s.submit(chunks, on_result=seen.__setitem__))
+    assert seen == {index: index for index in chunks}
+
+
+def test_batch_key_splits_model_calls():
+    calls = []
+
+    def generate(chunks, options):
+        calls.append([len(chunk) for chunk in chunks])
+        return chunks
+
+    scheduler = InferenceScheduler(generate, max_batch_size=16, max_wait_ms=20,
+                                   batch_key=lambda chunk, options: len(chunk) > 2)
+    chunks = [[1], [1, 2, 3], [1, 2], [1, 2, 3, 4]]
+    assert run_scheduler(scheduler, lambda s: s.submit(chunks)) == chunks
+    # Один вызов на группу, размер батча в статистике - размер вызова
+    assert sorted(calls) == [[1, 2], [3, 4]]
+    assert scheduler.batches == 2
@@ -7,8 +7,10 @@
 2) Обрабатывает пользовательский ввод::
     2.1 Через текстовое поле (прямой ввод)
     2.2 Через загрузку .txt-файла (st.file_uploader)
-3) Отправляет запросы к бэкенду (FastAPI): передает текст на /summarize эндпоинт
-4) Отображает результаты: показывает саммари
+3) Отправляет запросы к бэкенду (FastAPI): передает текст на /summarize/stream эндпоинт,
+   загруженные файлы - асинхронной задачей на /jobs с опросом статуса
+4) Отображает результаты по мере готовности: саммари частей текста (или прогресс задачи),
+   затем итоговое саммари
 5) Обрабатывает ошибки:
     5.1 Обращении к бэкенду
     5.2 Загрузке файлов
@@ -19,9 +21,84 @@
 # Импорт необходимых библиотек
 import streamlit as st  # Для создания веб-интерфейса
 import requests         # Для отправки HTTP-запросов к backend
+import json             # Для разбора потоковых событий (NDJSON)
+import time             # Пауза между опросами статуса задачи
 
-# URL backend сервиса для суммаризации текста
-BACKEND_URL = "http://backend:8000/summarize"
+# URL потоковой суммаризации (саммари частей текста приходят по мере готовности)
+BACKEND_STREAM_URL = "http://backend:8000/summarize/stream"
+# URL асинхронных задач (большие файлы обрабатываются без долгого HTTP-соединения)
+BACKEND_JOBS_URL = "http://backend:8000/jobs"
+JOB_POLL_SECONDS = 2    # Интервал опроса статуса задачи
+
+
+def show_summary(summary, words_count):
+    """
+    Отображает итоговое саммари и статистику сжатия
+
+    """
+    st.subheader("Результат суммаризации:")
+    st.write(summary)
+
+    # Расчет и отображение статистики сжатия
+    summary_length = len(summary.split())
+    ratio = summary_length / words_count * 100
+    st.success(
+        f"Сжатие: {words_count} → {summary_length} слов "
+        f"({ratio:.1f}% от оригинала)"
+    )
+
+
+def poll_job(job_id, words_count):
+    """
+    Опрашивает статус задачи до ее завершения и отображает прогресс и результат.
+    Задача выполняется на backend независимо от страницы: после перезапуска
+    страницы опрос продолжается с той же задачей. Пока backend недоступен
+    или перезапускается (ошибка соединения, 5xx), опрос продолжается;
+    задача забывается только при ответе 4xx (например, 404 - задачи нет).
+
+    """
+    status_text = st.empty()
+    progress_bar = st.progress(0)
+    while True:
+        try:
+            response = requests.get(f"{BACKEND_JOBS_URL}/{job_id}", timeout=10)
+        except requests.exceptions.RequestException:
+            status_text.warning("Сервер недоступен, повторяем запрос...")
+            time.sleep(JOB_POLL_SECONDS)
+            continue
+        if response.status_code >= 500:
+            status_text.warning(f"Сервер временно недоступен ({response.status_code}), повторяем запрос...")
+            time.sleep(JOB_POLL_SECONDS)
+            continue
+        if response.status_code != 200:
+            status_text.empty()
+            st.error(f"Ошибка сервера: {response.status_code}")
+            del st.session_state["job_id"]
+            return
+        job = response.json()
+
+        if job["status"] == "done":
+            progress_bar.progress(1.0)
+            status_text.empty()
+            del st.session_state["job_id"]
+            show_summary(job["summary"], words_count)
+            return
+        if job["status"] == "failed":
+            del st.session_state["job_id"]
+            st.error(f"Ошибка: {job.get('error', 'Неизвестная ошибка')}")
+            return
+
+        # Прогресс текущего уровня дерева (уровень 0 - части текста, дальше - сокращение)
+        progress = job["progress"]
+        if progress["chunks_total"]:
+            progress_bar.progress(progress["chunks_done"] / progress["chunks_total"])
+            status_text.info(
+                f"Уровень {progress['level']}: готово {progress['chunks_done']} "
+                f"из {progress['chunks_total']} частей"
+            )
+        else:
+            status_text.info("Задача в очереди...")
+        time.sleep(JOB_POLL_SECONDS)
 
 
 def main():
@@ -57,42 +134,79 @@ def main():
             else:
                 st.warning("Поддерживаются только TXT файлы в данной версии")
 
+    # Быстрый режим: жадное декодирование вместо beam search
+    fast = st.checkbox("Быстрый режим (немного ниже качество)")
+
     # Кнопка для запуска суммаризации (активна только если есть текст)
     if st.button("Сгенерировать саммари") and text:
-        with st.spinner("Анализируем текст..."):        # Индикатор загрузки
+        # Подсчет статистики по тексту
+        words_count = len(text.split())
+        chars_count = len(text)
+        st.info(f"Текст содержит: {words_count} слов, {chars_count} символов")
+        payload = {"text": text, "profile": "fast" if fast else "default"}
+
+        if input_method == "Файл":
+            # Файл отправляется асинхронной задачей, результат забирается опросом ниже
             try:
-                # Подсчет статистики по тексту
-                words_count = len(text.split())
-                chars_count = len(text)
-                st.info(f"Текст содержит: {words_count} слов, {chars_count} символов")
-
-                # Отправка запроса к backend API
-                response = requests.post(BACKEND_URL, json={"text": text})
-
-                # Обработка ответа от сервера
-                if response.status_code == 200:
-                    result = response.json()
-                    if "summary" in result:
-                        # Отображение результата суммаризации
-                        st.subheader("Результат суммаризации:")
-                        st.write(result["summary"])
-
-                        # Расчет и отображение статистики сжатия
-                        summary_length = len(result["summary"].split())
-                        ratio = summary_length / words_count * 100
-                        st.success(
-                            f"Сжатие: {words_count} → {summary_length} слов "
-                            f"({ratio:.1f}% от оригинала)"
-                        )
-                    else:
-                        # Ошибка от сервера (например, проблема с моделью)
-                        st.error(f"Ошибка: {result.get('error', 'Неизвестная ошибка')}")
-                else:
-                    # Ошибка HTTP-запроса
+                response = requests.post(BACKEND_JOBS_URL, json=payload)
+                if response.status_code != 202:
                     st.error(f"Ошибка сервера: {response.status_code}")
+                else:
+                    st.session_state["job_id"] = response.json()["id"]
+                    st.session_state["job_words"] = words_count
             except Exception as e:
-                # Обработка других исключений (например, проблемы с подключением)
                 st.error(f"Произошла ошибка при обработке: {str(e)}")
+        else:
+            # Любое действие пользователя (в том числе эта кнопка) прерывает текущий запуск,
+            # соединение с backend закрывается и он прекращает обработку текста
+            st.button("Отменить")
+            stream_summary(payload, words_count)
+
+    # Задача по загруженному файлу: опрос статуса до результата
+    if st.session_state.get("job_id"):
+        try:
+            poll_job(st.session_state["job_id"], st.session_state["job_words"])
+        except Exception as e:
+            st.error(f"Произошла ошибка при обработке: {str(e)}")
+
+
+def stream_summary(payload, words_count):
+    """
+    Потоковая суммаризация текста: саммари частей по мере готовности, затем итог
+
+    """
+    with st.spinner("Анализируем текст..."):        # Индикатор загрузки
+        try:
+            # Потоковый запрос к backend API
+            with requests.post(BACKEND_STREAM_URL, json=payload, stream=True) as response:
+                if response.status_code != 200:
+                    # Ошибка HTTP-запроса
+                    st.error(f"Ошибка сервера: {response.status_code}")
+                    return
+
+                # Саммари частей текста отображаются по мере готовности
+                progress = st.expander("Саммари частей текста", expanded=True)
+                chunk_count = 0
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+
+                    if event["type"] == "chunk":
+                        chunk_count += 1
+                        progress.markdown(
+                            f"**Уровень {event['level']}, часть {event['index'] + 1}:** "
+                            f"{event['summary']}"
+                        )
+                    elif event["type"] == "summary":
+                        # Отображение результата суммаризации
+                        show_summary(event["summary"], words_count)
+                    else:
+                        # Ошибка от сервера (например, проблема с моделью)
+                        st.error(f"Ошибка: {event.get('error', 'Неизвестная ошибка')}")
+        except Exception as e:
+            # Обработка других исключений (например, проблемы с подключением)
+            st.error(f"Произошла ошибка при обработке: {str(e)}")
 
 
 # Запуск приложения при прямом выполнении файла